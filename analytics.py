@@ -0,0 +1,208 @@
+import threading
+import time
+
+import pandas as pd
+
+import repository
+
+# ==========================================
+# ANALYTICS SNAPSHOTS
+# ==========================================
+# Columnar copies of TasksTable and FollowupsTable shared by every session.
+# After the first load only tasks with a newer updated_at and followups
+# with a higher id are fetched, every SNAPSHOT_RECHECK seconds. Deleted
+# tasks are only dropped by the full reload every SNAPSHOT_REBUILD seconds.
+# Both run on a background thread, never inside a user's rerun.
+SNAPSHOT_RECHECK = 60
+SNAPSHOT_REBUILD = 1800
+# Within the hosted API's 1000 rows per response
+SNAPSHOT_BATCH = repository.EXPORT_BATCH
+TASK_COLUMNS = ["id", "status", "priority", "deadline", "assigned_to", "assigned_to_id",
+                "created_at", "updated_at", "completed_at"]
+FOLLOWUP_COLUMNS = ["id", "task_id", "created_at"]
+TIME_COLUMNS = ["created_at", "updated_at", "completed_at"]
+
+_lock = threading.Lock()
+_snapshot = {"tasks": None, "followups": None, "built_at": None, "checked_at": 0, "version": 0,
+             "refreshing": False, "error": None}
+# Set once the first snapshot load has finished
+_ready = threading.Event()
+_metrics = {}
+
+
+def _frame(batches, columns):
+    rows = [row for batch in batches for row in batch]
+    df = pd.DataFrame(rows, columns=columns)
+    for column in TIME_COLUMNS:
+        if column in df:
+            df[column] = pd.to_datetime(df[column], errors="coerce", utc=True, format="ISO8601")
+    if "deadline" in df:
+        df["deadline"] = pd.to_datetime(df["deadline"], errors="coerce", format="ISO8601")
+    if "status" in df:
+        df["status"] = df["status"].astype("category")
+    return df
+
+
+def _load_tasks(changed_since=None):
+    return _frame(repository.iter_rows("TasksTable", ", ".join(TASK_COLUMNS),
+                                       changed_since=changed_since, batch_size=SNAPSHOT_BATCH), TASK_COLUMNS)
+
+
+def _load_followups(after_id=0):
+    return _frame(repository.iter_rows("FollowupsTable", ", ".join(FOLLOWUP_COLUMNS),
+                                       after_id=after_id, batch_size=SNAPSHOT_BATCH), FOLLOWUP_COLUMNS)
+
+
+def _watermark(tasks):
+    # Changes in the same second as the newest one are fetched again and
+    # replace their old rows by id
+    newest = tasks["updated_at"].max()
+    if pd.isna(newest):
+        return None
+    return newest.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _refresh(rebuild):
+    # Runs on its own thread: loads and merges with no lock held, then swaps
+    # the new frames in
+    now = time.monotonic()
+    state = _snapshot
+    try:
+        if rebuild:
+            update = {"tasks": _load_tasks(), "followups": _load_followups(), "built_at": now}
+        else:
+            tasks, followups = state["tasks"], state["followups"]
+            changed = _load_tasks(_watermark(tasks))
+            # Rows re-fetched from the watermark second that did not change
+            held = changed["id"].map(tasks.set_index("id")["updated_at"])
+            changed = changed[changed["updated_at"].ne(held)]
+            if len(changed):
+                tasks = pd.concat([tasks[~tasks["id"].isin(changed["id"])], changed], ignore_index=True)
+                tasks["status"] = tasks["status"].astype("category")
+            newer = _load_followups(int(followups["id"].max()) if len(followups) else 0)
+            if len(newer):
+                followups = pd.concat([followups, newer], ignore_index=True)
+            update = {"tasks": tasks, "followups": followups} if len(changed) or len(newer) else {}
+        with _lock:
+            if update:
+                state.update(update, refreshed_at=pd.Timestamp.now(tz="UTC"), version=state["version"] + 1)
+            state.update(checked_at=now, error=None)
+    except Exception as e:
+        # Kept for the panel; the next tick after SNAPSHOT_RECHECK retries
+        with _lock:
+            state.update(checked_at=now, error=e)
+    finally:
+        with _lock:
+            state["refreshing"] = False
+        _ready.set()
+
+
+def get_snapshot(wait=True):
+    # (tasks, followups, refreshed_at) DataFrames. Refreshes run in the
+    # background at most every SNAPSHOT_RECHECK seconds and callers get the
+    # current snapshot meanwhile. Until a first load has succeeded this
+    # waits for it, or with wait=False returns None (see load_error()).
+    now = time.monotonic()
+    with _lock:
+        state = _snapshot
+        # A failed load is retried on the next tick, not on every call
+        retry_later = state["error"] is not None and now - state["checked_at"] <= SNAPSHOT_RECHECK
+        if not state["refreshing"] and not retry_later:
+            rebuild = state["built_at"] is None or now - state["built_at"] > SNAPSHOT_REBUILD
+            if rebuild or now - state["checked_at"] > SNAPSHOT_RECHECK:
+                state["refreshing"] = True
+                threading.Thread(target=_refresh, args=(rebuild,), name="analytics-refresh", daemon=True).start()
+    if not wait and not _ready.is_set():
+        return None
+    _ready.wait()
+    with _lock:
+        if state["tasks"] is None:
+            if not wait:
+                return None
+            raise RuntimeError("Analytics data could not be loaded") from state["error"]
+        return state["tasks"], state["followups"], state["refreshed_at"]
+
+
+def load_error():
+    # The exception of the last failed load, None once one succeeds
+    with _lock:
+        return _snapshot["error"]
+
+
+# ==========================================
+# METRICS
+# ==========================================
+# All group-bys over the snapshot; results are kept until the snapshot
+# changes.
+def _workload(tasks, today):
+    open_tasks = tasks[tasks["status"] != "Finished"]
+    grouped = open_tasks.assign(
+        overdue=open_tasks["deadline"] < today,
+        high=open_tasks["priority"] == "High",
+    ).groupby("assigned_to_id", dropna=False)
+    workload = grouped.agg(
+        assignee=("assigned_to", "last"),
+        open=("id", "size"),
+        overdue=("overdue", "sum"),
+        high_priority=("high", "sum"),
+        next_deadline=("deadline", "min"),
+    )
+    return workload.sort_values(["overdue", "open"], ascending=False).reset_index(drop=True)
+
+
+def _time_to_finish(tasks):
+    finished = tasks[(tasks["status"] == "Finished") & tasks["completed_at"].notna() & tasks["created_at"].notna()]
+    days = (finished["completed_at"] - finished["created_at"]).dt.total_seconds() / 86400
+    finished = finished.assign(days=days)
+    per_assignee = finished.groupby("assigned_to_id", dropna=False).agg(
+        assignee=("assigned_to", "last"),
+        finished=("id", "size"),
+        median_days=("days", "median"),
+        p90_days=("days", lambda d: d.quantile(0.9)),
+    )
+    on_time = (finished["completed_at"].dt.tz_localize(None).dt.normalize() <= finished["deadline"])
+    per_assignee["on_time"] = on_time.groupby(finished["assigned_to_id"], dropna=False).mean() * 100
+    buckets = pd.cut(days, bins=[0, 1, 3, 7, 14, 30, float("inf")], right=False,
+                     labels=["<1d", "1-3d", "3-7d", "1-2w", "2-4w", "30d+"])
+    distribution = buckets.value_counts(sort=False).rename("tasks")
+    return per_assignee.sort_values("finished", ascending=False).reset_index(drop=True).round(1), distribution
+
+
+def _followup_frequency(tasks, followups):
+    per_task = followups.groupby("task_id").size()
+    # Tasks without any followup count as zero
+    counts = per_task.reindex(tasks["id"], fill_value=0)
+    summary = {
+        "tasks": len(counts),
+        "mean": round(float(counts.mean()), 2) if len(counts) else 0,
+        "median": float(counts.median()) if len(counts) else 0,
+        "without_followups": int((counts == 0).sum()),
+    }
+    busiest = per_task.nlargest(10).rename("followups").rename_axis("task_id").reset_index()
+    weekly = followups.set_index("created_at").resample("W")["id"].count().tail(12).rename("followups")
+    return summary, busiest, weekly
+
+
+def get_metrics(wait=True):
+    snapshot = get_snapshot(wait)
+    if snapshot is None:
+        return None
+    tasks, followups, refreshed_at = snapshot
+    version = _snapshot["version"]
+    cached = _metrics.get("value")
+    if cached is not None and _metrics.get("version") == version:
+        return cached
+    today = pd.Timestamp.now().normalize()
+    per_assignee, distribution = _time_to_finish(tasks)
+    summary, busiest, weekly = _followup_frequency(tasks, followups)
+    value = {
+        "refreshed_at": refreshed_at,
+        "workload": _workload(tasks, today),
+        "time_to_finish": per_assignee,
+        "finish_distribution": distribution,
+        "followup_summary": summary,
+        "busiest_tasks": busiest,
+        "followups_weekly": weekly,
+    }
+    _metrics.update(version=version, value=value)
+    return value
@@ -1,12 +1,24 @@
 import streamlit as st
-from supabase import create_client
 import pandas as pd
-from datetime import datetime
-from PIL import Image
+from datetime import datetime, timedelta
+from collections import deque
+from concurrent.futures import as_completed
 import base64
+import functools
+import os
 import secrets
 import string
-import os
+import analytics
+import assets
+import exports
+import imports
+import instrumentation
+import repository
+import resources
+import uploads
+
+# Every backend call made during this script run is recorded against it
+instrumentation.start_run()
 
 # ==========================================
 # PAGE CONFIGURATION
@@ -21,192 +33,15 @@ st.set_page_config(
 # ==========================================
 # EXECUTIVE COMMAND CENTER CSS
 # ==========================================
-st.markdown("""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
-    
-    * { font-family: 'Inter', sans-serif; }
-    
-    .stApp { background: #fafbfc; }
-    
-    #MainMenu, footer, header { visibility: hidden; }
-    .block-container { padding: 1.5rem 2rem; max-width: 100%; }
-    
-    /* KPI Cards */
-    .kpi-card {
-        background: white;
-        border: 1px solid #e2e8f0;
-        border-radius: 6px;
-        padding: 1rem 1.25rem;
-        text-align: center;
-    }
-    .kpi-value {
-        font-size: 2rem;
-        font-weight: 700;
-        color: #2d3748;
-        margin: 0;
-    }
-    .kpi-label {
-        font-size: 0.8125rem;
-        color: #718096;
-        margin-top: 0.25rem;
-        font-weight: 500;
-    }
-    
-    /* Task Row */
-    .task-row {
-        padding: 0.875rem 1rem;
-        border-bottom: 1px solid #e2e8f0;
-        cursor: pointer;
-        transition: background 0.1s;
-    }
-    .task-row:hover {
-        background: #f7fafc;
-    }
-    .task-row.selected {
-        background: #edf2f7;
-        border-left: 3px solid #9f7928;
-    }
-    .task-title {
-        font-size: 0.9375rem;
-        font-weight: 500;
-        color: #2d3748;
-        margin-bottom: 0.25rem;
-    }
-    .task-meta {
-        font-size: 0.8125rem;
-        color: #718096;
-    }
-    
-    /* Priority Dots */
-    .priority-dot {
-        display: inline-block;
-        width: 8px;
-        height: 8px;
-        border-radius: 50%;
-        margin-right: 0.5rem;
-    }
-    .priority-high { background: #e53e3e; }
-    .priority-medium { background: #ed8936; }
-    .priority-low { background: #48bb78; }
-    
-    /* Clean Inputs */
-    .stTextInput > div > div > input,
-    .stTextArea > div > div > textarea {
-        border: 1px solid #e2e8f0 !important;
-        border-radius: 6px !important;
-        padding: 0.625rem 0.875rem !important;
-        font-size: 0.9375rem !important;
-    }
-    
-    .stTextInput > div > div > input:focus,
-    .stTextArea > div > div > textarea:focus {
-        border-color: #9f7928 !important;
-        box-shadow: 0 0 0 1px #9f7928 !important;
-    }
-    
-    /* Clean Buttons */
-    .stButton > button {
-        background: #9f7928 !important;
-        color: white !important;
-        border: none !important;
-        border-radius: 6px !important;
-        padding: 0.625rem 1.25rem !important;
-        font-size: 0.9375rem !important;
-        font-weight: 500 !important;
-        transition: background 0.15s !important;
-    }
-    
-    .stButton > button:hover {
-        background: #8a6a24 !important;
-    }
-    
-    /* Section Headers */
-    .section-header {
-        font-size: 0.875rem;
-        font-weight: 600;
-        color: #4a5568;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-        margin-bottom: 1rem;
-        padding-bottom: 0.5rem;
-        border-bottom: 1px solid #e2e8f0;
-    }
-    
-    /* Detail Panel */
-    .detail-panel {
-        background: white;
-        border: 1px solid #e2e8f0;
-        border-radius: 6px;
-        padding: 1.5rem;
-        min-height: 600px;
-    }
-    
-    /* Activity Item */
-    .activity-item {
-        padding: 0.75rem;
-        background: #f7fafc;
-        border-left: 2px solid #e2e8f0;
-        margin-bottom: 0.75rem;
-        border-radius: 4px;
-    }
-    .activity-author {
-        font-weight: 600;
-        color: #2d3748;
-        font-size: 0.875rem;
-    }
-    .activity-content {
-        color: #4a5568;
-        font-size: 0.875rem;
-        margin-top: 0.25rem;
-    }
-    
-    /* Status Badges */
-    .status-badge {
-        display: inline-block;
-        padding: 0.25rem 0.625rem;
-        border-radius: 4px;
-        font-size: 0.8125rem;
-        font-weight: 500;
-    }
-    .status-pending { background: #bee3f8; color: #2c5282; }
-    .status-finished { background: #c6f6d5; color: #22543d; }
-    
-    /* Remove labels */
-    .stTextInput > label,
-    .stTextArea > label,
-    .stSelectbox > label { display: none !important; }
-    
-    /* Tabs - Login Only */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 0;
-        background: transparent;
-        border-bottom: 1px solid #e2e8f0;
-        justify-content: center;
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        background: transparent;
-        color: #718096;
-        font-weight: 500;
-        padding: 0.875rem 2rem;
-        border-bottom: 2px solid transparent;
-    }
-    
-    .stTabs [data-baseweb="tab"][aria-selected="true"] {
-        color: #2d3748;
-        font-weight: 600;
-        border-bottom-color: #9f7928;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(assets.APP_CSS, unsafe_allow_html=True)
 
 # ==========================================
 # DATABASE CONNECTION
 # ==========================================
-URL = st.secrets["URL"]
-KEY = st.secrets["KEY"]
-supabase = create_client(URL, KEY)
+# Built once per server process, not per session or rerun
+repository.set_client(resources.get_backend())
+blob_store = resources.get_blob_store()
+resources.start_scheduler()
 
 # ==========================================
 # SESSION STATE INITIALIZATION
@@ -238,33 +73,831 @@ def format_file_size(size_bytes):
         size_bytes /= 1024.0
     return f"{size_bytes:.1f} TB"
 
-def save_file_to_database(file, task_id, uploaded_by):
-    try:
-        file_bytes = file.read()
-        file_base64 = base64.b64encode(file_bytes).decode('utf-8')
-        file_record = {
-            "task_id": task_id, "file_name": file.name, "file_type": file.type,
-            "file_size": len(file_bytes), "file_data": file_base64,
-            "uploaded_by": uploaded_by, "uploaded_at": datetime.now().isoformat()
-        }
-        supabase.table("TaskFilesTable").insert(file_record).execute()
-        return True, "File uploaded"
-    except Exception as e:
-        return False, str(e)
+def save_files_to_database(files, task_id, uploaded_by):
+    # Files are stored concurrently and inserted in one batch; the progress
+    # bar advances as each one finishes
+    progress = st.progress(0.0, text="Uploading...")
+    records, errors = uploads.upload_files(
+        files, task_id, uploaded_by, blob_store,
+        max_file_bytes=int(st.secrets.get("MAX_UPLOAD_FILE_MB", uploads.MAX_FILE_MB)) * 1024 * 1024,
+        max_batch_bytes=int(st.secrets.get("MAX_UPLOAD_BATCH_MB", uploads.MAX_BATCH_MB)) * 1024 * 1024,
+        on_progress=lambda done, total, name: progress.progress(done / total, text=f"{name} ({done}/{total})"),
+    )
+    progress.empty()
+    for name, reason in errors:
+        st.warning(f"Not uploaded: {name} - {reason}")
+    return records, errors
 
 def get_task_files(task_id):
-    try:
-        response = supabase.table("TaskFilesTable").select("*").eq("task_id", task_id).execute()
-        return response.data if response.data else []
-    except:
-        return []
+    return repository.get_task_files(task_id)
+
+def reset_page(state_key):
+    st.session_state[state_key] = 1
+
+def fetch_task_page(state_key, **query):
+    # Page number lives in session state; clamp it if the list shrank
+    page = st.session_state.get(state_key, 1)
+    tasks, total = repository.list_tasks(page=page, **query)
+    last_page = max(1, -(-total // repository.PAGE_SIZE))
+    if page > last_page:
+        page = st.session_state[state_key] = last_page
+        tasks, total = repository.list_tasks(page=page, **query)
+    return tasks, total, page, last_page
+
+def render_pagination(state_key, total, page, last_page):
+    if last_page <= 1:
+        return
+    col_prev, col_info, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("◀", key=f"{state_key}_prev", disabled=page <= 1, use_container_width=True):
+            st.session_state[state_key] = page - 1
+            st.rerun(scope="fragment")
+    with col_info:
+        st.markdown(f"<p style='text-align: center; color: #718096; font-size: 0.8125rem; margin-top: 0.6rem;'>Page {page} of {last_page} • {total} tasks</p>", unsafe_allow_html=True)
+    with col_next:
+        if st.button("▶", key=f"{state_key}_next", disabled=page >= last_page, use_container_width=True):
+            st.session_state[state_key] = page + 1
+            st.rerun(scope="fragment")
+
+def render_kpi_cards(kpis):
+    cards = [
+        (kpis['active'], "ACTIVE TASKS"),
+        (kpis['completed'], "COMPLETED"),
+        (kpis['high_priority'], "HIGH PRIORITY"),
+        (kpis['total'], "TOTAL TASKS"),
+    ]
+    for col, (value, label) in zip(st.columns(4), cards):
+        with col:
+            st.markdown(f"""
+            <div class="kpi-card">
+                <div class="kpi-value">{value}</div>
+                <div class="kpi-label">{label}</div>
+            </div>
+            """, unsafe_allow_html=True)
+
+def render_activity_log(task_id):
+    activities, has_older = repository.get_activity(task_id)
+    if activities:
+        # One markdown block for the whole log instead of one per entry
+        st.markdown("".join(f"""
+        <div class='activity-item'>
+            <div class='activity-author'>{act.get('author_name', 'Unknown')}</div>
+            <div class='activity-content'>{act.get('content', '')}</div>
+        </div>
+        """ for act in activities), unsafe_allow_html=True)
+        if has_older and st.button("Load older", key=f"older_{task_id}"):
+            repository.load_older_activity(task_id)
+            st.rerun(scope="fragment")
+    else:
+        st.caption("No activity yet")
+
+def load_blob(content_hash):
+    # Recently read blobs are served from a size-bounded LRU
+    data = repository.download_cache.get(("blob", content_hash))
+    if data is None:
+        with blob_store.open(content_hash) as blob:
+            data = blob.read()
+        repository.download_cache.put(("blob", content_hash), data)
+    return data
+
+def load_file_bytes(file):
+    if file.get('content_hash'):
+        return load_blob(file['content_hash'])
+    # Legacy rows still carry their payload inline
+    cache_key = ("TaskFilesTable", file['id'])
+    data = repository.download_cache.get(cache_key)
+    if data is None:
+        data = base64.b64decode(repository.get_file_data(file['id']) or '')
+        repository.download_cache.put(cache_key, data)
+    return data
+
+def render_diagnostics(run):
+    # Boss-only view of the backend calls made by the last full script run
+    totals = run.totals()
+    with st.expander("Performance diagnostics", expanded=False):
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Render", f"{totals['render_ms']:.0f} ms")
+        col2.metric("Queries", totals['queries'])
+        col3.metric("Query time", f"{totals['query_ms']:.0f} ms")
+        col4.metric("Payload", format_file_size(totals['bytes']))
+        for (table, operation, filters), count in run.repeated().items():
+            st.warning(f"{table}.{operation} with {', '.join(filters) or 'no filters'} ran {count} times in one run")
+        if run.calls:
+            calls = pd.DataFrame(run.calls)
+            calls['filters'] = calls['filters'].str.join(' ')
+            st.dataframe(calls, use_container_width=True, hide_index=True)
+        fragment_runs = st.session_state.get('fragment_runs')
+        if fragment_runs:
+            # Widgets inside a fragment rerun only that fragment
+            st.caption("Recent fragment reruns")
+            st.dataframe(pd.DataFrame([{"fragment": r.label, **r.totals()} for r in reversed(fragment_runs)]),
+                         use_container_width=True, hide_index=True)
+        st.caption("Process totals since start")
+        st.dataframe(pd.DataFrame.from_dict(instrumentation.metrics.snapshot(), orient='index'), use_container_width=True)
+
+def render_file_download(file, key_prefix):
+    # Bytes are only fetched once the user asks for them
+    if st.session_state.get('download_file') == file['id']:
+        try:
+            st.download_button("Save", data=load_file_bytes(file), file_name=file['file_name'],
+                               mime=file['file_type'], key=f"{key_prefix}_save_{file['id']}")
+        except FileNotFoundError:
+            st.caption("Missing")
+    elif st.button("Download", key=f"{key_prefix}_dl_{file['id']}"):
+        st.session_state.download_file = file['id']
+        st.rerun(scope="fragment")
+
+# ==========================================
+# DASHBOARD FRAGMENTS
+# ==========================================
+# Each fragment reruns on its own: interacting with a widget inside it
+# re-executes only that function, not the whole script. Actions that change
+# the KPI cards or the task list (create, reprioritize, complete, delete)
+# still rerun the whole app.
+# Fragment reruns kept for the diagnostics panel
+FRAGMENT_RUNS_KEPT = 10
+
+def recorded_fragment(fn):
+    # st.fragment whose own reruns are timed and counted like full runs
+    @functools.wraps(fn)
+    def body(*args, **kwargs):
+        with instrumentation.fragment_run(fn.__name__) as run:
+            if run is not None:
+                st.session_state.setdefault('fragment_runs', deque(maxlen=FRAGMENT_RUNS_KEPT)).append(run)
+            return fn(*args, **kwargs)
+    return st.fragment(body)
+
+def is_boss(user):
+    return user["role"].lower() == "boss"
+
+def select_task(task_id):
+    st.session_state.selected_task = task_id
+
+def get_prefetcher():
+    # Detail of the tasks this session is likely to open next
+    if 'prefetcher' not in st.session_state:
+        st.session_state.prefetcher = repository.DetailPrefetcher()
+    return st.session_state.prefetcher
+
+def toggle_bulk(task_id):
+    # Selected ids survive paging and filtering until an action is applied;
+    # the actions read the current rows themselves
+    selected = st.session_state.setdefault("bulk_selected", set())
+    if st.session_state.get(f"bulk_{task_id}"):
+        selected.add(task_id)
+    else:
+        selected.discard(task_id)
+
+def clear_bulk():
+    for task_id in st.session_state.get("bulk_selected", set()):
+        st.session_state.pop(f"bulk_{task_id}", None)
+    st.session_state.bulk_selected = set()
+
+ALERT_LABELS = {"overdue": "⚠️ Overdue", "due_soon": "⏰ Due soon"}
+
+def alert_label(task, alerts):
+    # Flags come precomputed from the scheduler; finished tasks never show one
+    alert = alerts.get(task['id'])
+    if not alert or task.get('status') == 'Finished':
+        return ""
+    return ALERT_LABELS.get(alert['level'], "")
 
-def create_download_link(file_data, file_name, file_type):
+def render_task_rows(tasks, show_assignee, selectable=False):
+    selected = st.session_state.get("bulk_selected", set())
+    alerts = repository.get_alerts()
+    # Prefetch candidates once the detail panel has drawn
+    st.session_state.listed_task_ids = [t['id'] for t in tasks]
+    for task in tasks:
+        priority_class = f"priority-{task.get('priority', 'medium').lower()}"
+        
+        # The click reruns the workspace fragment after the callback
+        if selectable:
+            col_check, col_title = st.columns([1, 11])
+            with col_check:
+                st.checkbox("Select", value=task['id'] in selected, key=f"bulk_{task['id']}",
+                            label_visibility="collapsed", on_change=toggle_bulk, args=(task['id'],))
+            with col_title:
+                st.button(f"{task['title']}", key=f"task_{task['id']}", use_container_width=True,
+                          on_click=select_task, args=(task['id'],))
+        else:
+            st.button(f"{task['title']}", key=f"task_{task['id']}", use_container_width=True,
+                      on_click=select_task, args=(task['id'],))
+        
+        assignee = f" • {task.get('assigned_to', 'N/A')}" if show_assignee else ""
+        flag = alert_label(task, alerts)
+        flag = f" • <strong style='color: #c53030;'>{flag}</strong>" if flag else ""
+        st.markdown(f"""
+        <div style='margin-top: -0.5rem; margin-bottom: 1rem; padding-left: 1rem; font-size: 0.8125rem; color: #718096;'>
+            <span class='priority-dot {priority_class}'></span>
+            {task.get('priority', 'Medium')}{assignee} • Due: {task.get('deadline', 'N/A')} • {task.get('status', 'Pending')}{flag}
+        </div>
+        """, unsafe_allow_html=True)
+
+SEARCH_ICONS = {"task": "📋", "followup": "💬", "file": "📎"}
+
+def render_search(curr_user):
+    # Ranked matches from the in-process index, staff only see their own tasks
+    query = st.text_input("Search", placeholder="🔍 Search tasks, comments and files",
+                          key="task_search", label_visibility="collapsed")
+    if not query.strip():
+        return
+    hits = repository.search(query, assignee_id=None if is_boss(curr_user) else curr_user["id"])
+    if not hits:
+        st.info("No matches")
+        return
+    for hit in hits:
+        snippet = hit['text'] if len(hit['text']) <= 80 else hit['text'][:77] + "..."
+        label = f"{SEARCH_ICONS.get(hit['kind'], '')} {snippet}"
+        if hit['kind'] != "task":
+            label += f" — {hit['title']}"
+        st.button(label, key=f"hit_{hit['kind']}_{hit['id']}", use_container_width=True,
+                  on_click=select_task, args=(hit['task_id'],))
+    st.markdown("---")
+
+def render_boss_task_list(curr_user):
+    st.markdown('<div class="section-header">TASK LIST</div>', unsafe_allow_html=True)
+    
+    # Create New Task for Boss
+    with st.expander("➕ Create New Task"):
+        assignee_search = st.text_input("Find assignee", placeholder="Filter assignees by name",
+                                        key="assignee_search", label_visibility="collapsed")
+        with st.form("boss_create_task", clear_on_submit=True):
+            task_title = st.text_input("", placeholder="Task title", label_visibility="collapsed")
+            
+            col_t1, col_t2 = st.columns(2)
+            with col_t1:
+                task_deadline = st.date_input("Deadline", label_visibility="collapsed")
+            with col_t2:
+                task_priority = st.selectbox("Priority", ["Low", "Medium", "High"], label_visibility="collapsed")
+            
+            # Active users matching the search above, from the shared directory
+            active_users = repository.search_active_users(assignee_search, limit=repository.PICKER_LIMIT)
+            
+            task_assign = st.selectbox("Assign to", active_users, format_func=lambda u: u['full_name'],
+                                       placeholder="No users available", label_visibility="collapsed")
+            
+            if st.form_submit_button("Create Task", use_container_width=True):
+                if task_title and task_assign:
+                    created = repository.create_task({
+                        "title": task_title,
+                        "deadline": str(task_deadline),
+                        "priority": task_priority,
+                        "status": "Pending",
+                        "assigned_to": task_assign['full_name'],
+                        "assigned_to_id": task_assign['id']
+                    })
+                    if created:
+                        st.success(f"Task created and assigned to {task_assign['full_name']}!")
+                        st.session_state.selected_task = created['id']
+                        st.rerun()
+                else:
+                    st.error("Title and assignment required")
+    
+    render_task_import()
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    # Filter and Sort
+    col_f1, col_f2 = st.columns(2)
+    with col_f1:
+        filter_status = st.selectbox("Filter", list(repository.STATUS_FILTERS), label_visibility="collapsed",
+                                     key="boss_filter", on_change=reset_page, args=("boss_task_page",))
+    with col_f2:
+        sort_by = st.selectbox("Sort", ["Deadline", "Priority", "Name", "Status"], label_visibility="collapsed",
+                               key="boss_sort", on_change=reset_page, args=("boss_task_page",))
+    
+    # Filtering, sorting and paging happen in the query
+    filtered_tasks, total_matches, page, last_page = fetch_task_page(
+        "boss_task_page", status=repository.STATUS_FILTERS[filter_status], sort_by=sort_by)
+    
+    bulk_mode = st.toggle("Select multiple", key="bulk_mode", on_change=clear_bulk)
+    if bulk_mode:
+        render_bulk_actions()
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    # Task rows
+    if filtered_tasks:
+        render_task_rows(filtered_tasks, show_assignee=True, selectable=bulk_mode)
+        render_pagination("boss_task_page", total_matches, page, last_page)
+    else:
+        st.info("No tasks found")
+
+def render_task_import():
+    with st.expander("📥 Import Tasks"):
+        st.caption("CSV or Excel with columns: title, assigned_to, priority, deadline")
+        sheet = st.file_uploader("Task sheet", type=["csv", "xlsx"], key="import_file", label_visibility="collapsed")
+        if sheet is None:
+            st.session_state.pop("import_checked", None)
+            return
+        
+        # Validate once per uploaded file, not on every rerun
+        checked = st.session_state.get("import_checked")
+        if not checked or checked["file_id"] != sheet.file_id:
+            try:
+                accepted, rejected = imports.validate(imports.read_table(sheet), repository.get_active_users())
+            except ValueError as e:
+                st.error(str(e))
+                return
+            checked = st.session_state.import_checked = {
+                "file_id": sheet.file_id, "accepted": accepted, "rejected": rejected
+            }
+        accepted, rejected = checked["accepted"], checked["rejected"]
+        
+        st.markdown(f"**{len(accepted)}** rows ready • **{len(rejected)}** rejected")
+        if len(rejected):
+            st.dataframe(rejected, use_container_width=True)
+        
+        batch_size = st.number_input("Rows per insert", min_value=1, max_value=1000, key="import_batch",
+                                     value=int(st.secrets.get("IMPORT_BATCH_SIZE", imports.BATCH_SIZE)))
+        if st.button(f"Import {len(accepted)} Tasks", key="import_apply", type="primary",
+                     disabled=not accepted, use_container_width=True):
+            created = imports.import_tasks(accepted, batch_size=int(batch_size))
+            st.session_state.pop("import_checked", None)
+            st.session_state.pop("import_file", None)
+            st.success(f"Imported {len(created)} tasks!")
+            st.rerun()
+
+BULK_ACTIONS = ["Set priority", "Set status", "Reassign", "Delete"]
+
+def render_bulk_actions():
+    # One batched write for the whole selection, then one full rerun
+    selected = list(st.session_state.get("bulk_selected", set()))
+    with st.container(border=True):
+        col_action, col_value = st.columns(2)
+        with col_action:
+            action = st.selectbox("Action", BULK_ACTIONS, key="bulk_action", label_visibility="collapsed")
+        with col_value:
+            if action == "Set priority":
+                value = st.selectbox("Priority", ["Low", "Medium", "High"], key="bulk_priority",
+                                     label_visibility="collapsed")
+            elif action == "Set status":
+                value = st.selectbox("Status", ["Pending", "Finished"], key="bulk_status",
+                                     label_visibility="collapsed")
+            elif action == "Reassign":
+                value = st.selectbox("Assign to", repository.get_active_users(), key="bulk_assignee",
+                                     format_func=lambda u: u['full_name'], placeholder="No users available",
+                                     label_visibility="collapsed")
+            else:
+                value = st.checkbox("Also delete their comments and files", key="bulk_delete_confirm")
+        
+        col_apply, col_clear = st.columns(2)
+        with col_apply:
+            apply = st.button(f"Apply to {len(selected)} selected", key="bulk_apply", type="primary",
+                              disabled=not selected or not value, use_container_width=True)
+        with col_clear:
+            st.button("Clear selection", key="bulk_clear", on_click=clear_bulk,
+                      disabled=not selected, use_container_width=True)
+    
+    if apply:
+        if action == "Set priority":
+            repository.update_tasks(selected, {"priority": value})
+        elif action == "Set status":
+            repository.update_tasks(selected, {"status": value})
+        elif action == "Reassign":
+            repository.update_tasks(selected, {"assigned_to": value['full_name'], "assigned_to_id": value['id']})
+        else:
+            repository.delete_tasks(selected)
+            if st.session_state.get('selected_task') in selected:
+                st.session_state.selected_task = None
+        clear_bulk()
+        st.rerun()
+
+def render_staff_task_list(curr_user):
+    st.markdown('<div class="section-header">MY TASKS</div>', unsafe_allow_html=True)
+    
+    # Quick add
+    with st.expander("➕ Create New Task"):
+        with st.form("quick_add", clear_on_submit=True):
+            title = st.text_input("", placeholder="Task title")
+            deadline = st.date_input("Deadline")
+            priority = st.selectbox("Priority", ["Low", "Medium", "High"])
+            if st.form_submit_button("Create"):
+                if title:
+                    repository.create_task({
+                        "title": title, "deadline": str(deadline), "priority": priority,
+                        "status": "Pending", "assigned_to": curr_user["name"],
+                        "assigned_to_id": curr_user["id"]
+                    })
+                    st.success("Task created!")
+                    st.balloons()
+                    st.rerun()
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    # Sort option for staff
+    sort_by = st.selectbox("Sort by", ["Deadline", "Priority", "Status"], label_visibility="collapsed",
+                           key="staff_sort", on_change=reset_page, args=("staff_task_page",))
+    
+    page_tasks, total_matches, page, last_page = fetch_task_page(
+        "staff_task_page", sort_by=sort_by, assignee_id=curr_user["id"])
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    # Task rows
+    if page_tasks:
+        render_task_rows(page_tasks, show_assignee=False)
+        render_pagination("staff_task_page", total_matches, page, last_page)
+    else:
+        st.info("No tasks found")
+
+@recorded_fragment
+def task_workspace(curr_user):
+    # Task list and detail panel; selecting a task or paging reruns only this
+    col_list, col_detail = st.columns([2, 3])
+    
+    # LEFT: Task List
+    with col_list:
+        render_search(curr_user)
+        if is_boss(curr_user):
+            render_boss_task_list(curr_user)
+        else:
+            render_staff_task_list(curr_user)
+    
+    # RIGHT: Task Detail
+    with col_detail:
+        st.markdown('<div class="section-header">TASK DETAILS</div>', unsafe_allow_html=True)
+        task_detail_panel(curr_user)
+    
+    # Warm the neighbours and the top of the list in the background
+    get_prefetcher().prefetch(repository.prefetch_candidates(
+        st.session_state.pop('listed_task_ids', []), st.session_state.get('selected_task')))
+
+@recorded_fragment
+def task_detail_panel(curr_user):
+    selected_id = st.session_state.get('selected_task')
+    if not selected_id:
+        st.info("Select a task from the list")
+        return
+    # Row, activity, files and alerts load in parallel
+    detail = repository.fetch_task_detail(selected_id, get_prefetcher())
+    task = detail["task"].result()
+    # Staff can only open their own tasks
+    if task and not is_boss(curr_user) and task.get('assigned_to_id') != curr_user['id']:
+        task = None
+    if not task:
+        st.info("Task not found")
+        return
+    
+    flag = alert_label(task, detail["alerts"].result())
+    alert_badge = f"<span class='status-badge' style='background: #fed7d7; color: #c53030;'>{flag}</span>" if flag else ""
+    
+    if is_boss(curr_user):
+        # Task info with priority selector for boss
+        col_title, col_priority = st.columns([2, 1])
+        with col_title:
+            st.markdown(f"### {task['title']}")
+        with col_priority:
+            new_priority = st.selectbox("Priority", ["Low", "Medium", "High"], 
+                                       index=["Low", "Medium", "High"].index(task.get('priority', 'Medium')),
+                                       key=f"prio_{task['id']}")
+            if new_priority != task.get('priority'):
+                if st.button("Update", key=f"upd_prio_{task['id']}"):
+                    repository.update_task(task, {"priority": new_priority})
+                    st.success("Priority updated!")
+                    st.rerun()
+        
+        st.markdown(f"""
+        <div style='margin: 1rem 0;'>
+            <span class='status-badge status-{task.get('status', 'pending').lower()}'>{task.get('status', 'Pending')}</span>
+            {alert_badge}
+            <span class='status-badge' style='background: #edf2f7; color: #2d3748;'>Assigned: {task.get('assigned_to', 'N/A')}</span>
+            <span class='status-badge' style='background: #edf2f7; color: #2d3748;'>Due: {task.get('deadline', 'N/A')}</span>
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        st.markdown(f"### {task['title']}")
+        st.markdown(f"""
+        <div style='margin: 1rem 0;'>
+            <span class='status-badge status-{task.get('status', 'pending').lower()}'>{task.get('status', 'Pending')}</span>
+            {alert_badge}
+            <span class='status-badge' style='background: #edf2f7; color: #2d3748;'>Priority: {task.get('priority', 'Medium')}</span>
+            <span class='status-badge' style='background: #edf2f7; color: #2d3748;'>Due: {task.get('deadline', 'N/A')}</span>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    st.markdown("<hr style='margin: 1.5rem 0; border-top: 1px solid #e2e8f0;'>", unsafe_allow_html=True)
+    
+    # Activity log
+    st.markdown("**Activity Log:**")
+    activity_slot = st.container()
+    
+    if is_boss(curr_user):
+        # Delete Task Button
+        st.markdown("<br>", unsafe_allow_html=True)
+        col_del1, col_del2, col_del3 = st.columns([1, 2, 1])
+        with col_del2:
+            if st.button("🗑️ Delete Task", key=f"del_{task['id']}", use_container_width=True, type="secondary"):
+                # Cascades to followups and files in one transaction
+                repository.delete_task(task)
+                st.session_state.selected_task = None
+                st.success("Task deleted!")
+                st.rerun()
+        
+        # File upload for boss
+        st.markdown("<br>", unsafe_allow_html=True)
+        st.markdown("**Upload Project Files:**")
+        with st.form(f"boss_file_upload_{task['id']}", clear_on_submit=True):
+            uploaded_files = st.file_uploader("", accept_multiple_files=True, label_visibility="collapsed", key=f"boss_upload_{task['id']}")
+            if st.form_submit_button("Upload Files", use_container_width=True):
+                if uploaded_files:
+                    records, errors = save_files_to_database(uploaded_files, task['id'], f"BOSS: {curr_user['name']}")
+                    if not errors:
+                        st.rerun(scope="fragment")
+                else:
+                    st.warning("Please select files first")
+    elif task.get('status') != 'Finished':
+        # File upload
+        st.markdown("<br>", unsafe_allow_html=True)
+        with st.form(f"staff_file_upload_{task['id']}", clear_on_submit=True):
+            uploaded_files = st.file_uploader("Upload files", accept_multiple_files=True, label_visibility="collapsed")
+            if st.form_submit_button("Upload", use_container_width=True):
+                if uploaded_files:
+                    records, errors = save_files_to_database(uploaded_files, task['id'], curr_user['name'])
+                    if records:
+                        st.success("Files uploaded!")
+                    if not errors:
+                        st.rerun(scope="fragment")
+                else:
+                    st.warning("Please select files first")
+    
+    # Show files
+    files_slot = st.container()
+    
+    # Log and files are drawn in whichever order their queries finish
+    slots = {
+        detail["activity"]: (activity_slot, lambda: activity_log_panel(task, curr_user)),
+        detail["files"]: (files_slot, lambda: render_file_list(task['id'], "boss" if is_boss(curr_user) else "staff")),
+    }
+    for future in as_completed(slots):
+        slot, render = slots[future]
+        with slot:
+            render()
+
+@recorded_fragment
+def activity_log_panel(task, curr_user):
+    # Log plus the comment form; posting refreshes only the log
+    render_activity_log(task['id'])
+    
+    st.markdown("<hr style='margin: 1.5rem 0; border-top: 1px solid #e2e8f0;'>", unsafe_allow_html=True)
+    
+    if is_boss(curr_user):
+        # Boss actions
+        with st.form("boss_update", clear_on_submit=True):
+            update_text = st.text_area("", placeholder="Add comment...", label_visibility="collapsed")
+            if st.form_submit_button("Add Comment", use_container_width=True):
+                if update_text:
+                    repository.add_followup(task['id'], f"BOSS: {curr_user['name']}", update_text)
+                    st.success("Comment added!")
+                    st.rerun(scope="fragment")
+    elif task.get('status') != 'Finished':
+        # Actions
+        with st.form("add_update", clear_on_submit=True):
+            update_text = st.text_area("", placeholder="Add progress update...", label_visibility="collapsed")
+            col_a, col_b = st.columns(2)
+            with col_a:
+                if st.form_submit_button("Add Update", use_container_width=True):
+                    if update_text:
+                        repository.add_followup(task['id'], curr_user['name'], update_text)
+                        st.success("Update added!")
+                        st.rerun(scope="fragment")
+            with col_b:
+                if st.form_submit_button("Mark Complete", use_container_width=True):
+                    repository.update_task(task, {"status": "Finished"})
+                    st.success("Task completed!")
+                    st.balloons()
+                    st.rerun()
+
+THUMB_COLUMNS = 4
+
+def render_thumbnail(file, key_prefix):
     try:
-        href = f'<a href="data:{file_type};base64,{file_data}" download="{file_name}" style="color: #9f7928; text-decoration: none; font-weight: 500;">Download</a>'
-        return href
-    except:
-        return 'Error'
+        st.image(load_blob(file['thumb_hash']))
+    except FileNotFoundError:
+        st.markdown(get_file_icon(file['file_name']))
+    st.caption(f"{file['file_name']} ({format_file_size(file['file_size'])})")
+    if st.button("Preview", key=f"{key_prefix}_prev_{file['id']}"):
+        st.session_state.preview_file = file['id']
+        st.rerun(scope="fragment")
+    render_file_download(file, key_prefix)
+    if st.button("Delete", key=f"del_file_{key_prefix}_{file['id']}", type="secondary"):
+        repository.delete_file(file)
+        st.success("File deleted!")
+        st.rerun(scope="fragment")
+
+def render_preview(file, key_prefix):
+    # Mid-size rendition; the original is only fetched through Download
+    with st.container(border=True):
+        try:
+            st.image(load_blob(file['preview_hash']), caption=file['file_name'])
+        except FileNotFoundError:
+            st.caption("Preview missing")
+        if st.button("Close Preview", key=f"{key_prefix}_close_prev"):
+            st.session_state.preview_file = None
+            st.rerun(scope="fragment")
+
+def render_file_list(task_id, key_prefix):
+    files = get_task_files(task_id)
+    if files:
+        st.markdown("<hr style='margin: 1.5rem 0; border-top: 1px solid #e2e8f0;'>", unsafe_allow_html=True)
+        st.markdown("**Attached Files:**")
+        
+        # Photos as a grid of thumbnails, only the small renditions are loaded
+        images = [f for f in files if f.get('thumb_hash')]
+        for start in range(0, len(images), THUMB_COLUMNS):
+            for col, file in zip(st.columns(THUMB_COLUMNS), images[start:start + THUMB_COLUMNS]):
+                with col:
+                    render_thumbnail(file, key_prefix)
+        previewed = next((f for f in images if f['id'] == st.session_state.get('preview_file')), None)
+        if previewed:
+            render_preview(previewed, key_prefix)
+        
+        for file in files:
+            if file.get('thumb_hash'):
+                continue
+            col_f1, col_f2, col_f3 = st.columns([3, 1, 1])
+            with col_f1:
+                st.markdown(f"{get_file_icon(file['file_name'])} {file['file_name']} ({format_file_size(file['file_size'])})")
+            with col_f2:
+                render_file_download(file, key_prefix)
+            with col_f3:
+                if st.button("Delete", key=f"del_file_{key_prefix}_{file['id']}", type="secondary"):
+                    repository.delete_file(file)
+                    st.success("File deleted!")
+                    st.rerun(scope="fragment")
+
+@recorded_fragment
+def user_management():
+    st.markdown('<div class="section-header">USER MANAGEMENT</div>', unsafe_allow_html=True)
+    
+    directory = repository.get_user_directory()
+    pending_users = directory.with_status('pending')
+    active_users = directory.with_status('active')
+    
+    user_sub_tabs = st.tabs([f"Pending ({len(pending_users)})", f"Active ({len(active_users)})"])
+    
+    # Pending users
+    with user_sub_tabs[0]:
+        # Show recently approved users first
+        if 'recently_approved' in st.session_state and st.session_state.recently_approved:
+            with st.container(border=True):
+                st.success("✅ User Successfully Approved!")
+                approval_info = st.session_state.recently_approved
+                st.markdown(f"""
+**Login Credentials to Share:**
+
+- **Name:** {approval_info['name']}
+- **Username:** `{approval_info['username']}`
+- **Password:** `{approval_info['password']}`
+
+*Please provide these credentials to the user.*
+                """)
+                if st.button("Clear Message", key="clear_approval"):
+                    st.session_state.recently_approved = None
+                    st.rerun(scope="fragment")
+            st.markdown("---")
+        
+        if pending_users:
+            for user in pending_users:
+                with st.container(border=True):
+                    col1, col2 = st.columns([3, 1])
+                    with col1:
+                        st.markdown(f"**{user['full_name']}**")
+                        st.markdown(f"Username: `{user.get('username', 'N/A')}`")
+                        st.markdown(f"Email: {user.get('email', 'N/A')}")
+                        st.markdown(f"Department: {user.get('department', 'N/A')}")
+                    with col2:
+                        if st.button("Approve", key=f"app_{user['id']}", use_container_width=True):
+                            repository.set_user_status(user['id'], "active")
+                            # Store approval info in session state; the directory
+                            # has no passwords, so read this one user's row
+                            approved = repository.get_user(user['id']) or {}
+                            st.session_state.recently_approved = {
+                                'name': user['full_name'],
+                                'username': user.get('username', 'N/A'),
+                                'password': approved.get('password', 'N/A')
+                            }
+                            st.rerun(scope="fragment")
+                        if st.button("Reject", key=f"rej_{user['id']}", use_container_width=True):
+                            repository.set_user_status(user['id'], "rejected")
+                            st.rerun(scope="fragment")
+        else:
+            st.info("No pending requests")
+    
+    # Active users
+    with user_sub_tabs[1]:
+        if active_users:
+            for user in active_users:
+                with st.expander(f"{user['full_name']} - {user.get('role', 'staff')}"):
+                    st.markdown(f"Username: `{user.get('username')}`")
+                    st.markdown(f"Role: {user.get('role')}")
+                    if st.button("Show Password", key=f"show_{user['id']}"):
+                        st.markdown(f"Password: `{(repository.get_user(user['id']) or {}).get('password', 'N/A')}`")
+                    if st.button("Reset Password", key=f"reset_{user['id']}"):
+                        new_pass = generate_temp_password()
+                        repository.set_user_password(user['id'], new_pass)
+                        st.success(f"New password: `{new_pass}`")
+        else:
+            st.info("No active users")
+
+@recorded_fragment
+def analytics_panel():
+    st.markdown('<div class="section-header">WORKLOAD & SLA</div>', unsafe_allow_html=True)
+    
+    # Shared snapshot, refreshed in the background at most once a minute;
+    # every tab renders on each rerun, so never wait for the first load here
+    metrics = analytics.get_metrics(wait=False)
+    if metrics is None:
+        if analytics.load_error() is not None:
+            st.error("Analytics data could not be loaded, retrying shortly")
+        else:
+            st.info("Analytics are loading...")
+        if st.button("Refresh", key="analytics_refresh"):
+            st.rerun(scope="fragment")
+        return
+    st.caption(f"Data as of {metrics['refreshed_at']:%Y-%m-%d %H:%M} UTC")
+    
+    workload = metrics["workload"]
+    col_a1, col_a2, col_a3 = st.columns(3)
+    col_a1.metric("Open Tasks", int(workload["open"].sum()))
+    col_a2.metric("Overdue", int(workload["overdue"].sum()))
+    col_a3.metric("Avg Follow-ups / Task", metrics["followup_summary"]["mean"])
+    
+    st.markdown("**Open Load by Assignee**")
+    st.dataframe(workload, use_container_width=True, hide_index=True, column_config={
+        "next_deadline": st.column_config.DateColumn("next deadline"),
+    })
+    
+    col_t1, col_t2 = st.columns([3, 2])
+    with col_t1:
+        st.markdown("**Time to Finish by Assignee (days)**")
+        st.dataframe(metrics["time_to_finish"], use_container_width=True, hide_index=True, column_config={
+            "on_time": st.column_config.NumberColumn("on time %", format="%.0f%%"),
+        })
+    with col_t2:
+        st.markdown("**Time to Finish**")
+        st.bar_chart(metrics["finish_distribution"])
+    
+    col_f1, col_f2 = st.columns(2)
+    with col_f1:
+        st.markdown("**Follow-ups per Week**")
+        st.bar_chart(metrics["followups_weekly"])
+    with col_f2:
+        summary = metrics["followup_summary"]
+        st.markdown("**Most Discussed Tasks**")
+        st.caption(f"Median {summary['median']:.0f} follow-ups per task • "
+                   f"{summary['without_followups']} of {summary['tasks']} tasks have none")
+        st.dataframe(metrics["busiest_tasks"], use_container_width=True, hide_index=True)
+
+@recorded_fragment
+def export_panel():
+    st.markdown('<div class="section-header">EXPORT</div>', unsafe_allow_html=True)
+    
+    with st.form("export_form"):
+        col_e1, col_e2 = st.columns(2)
+        with col_e1:
+            date_range = st.date_input("Created between", value=(), help="Leave empty to export all dates")
+            status_filter = st.selectbox("Status", list(repository.STATUS_FILTERS))
+        with col_e2:
+            assignee = st.selectbox("Assignee", [None] + repository.get_active_users(),
+                                    format_func=lambda u: "All assignees" if u is None else u['full_name'])
+            fmt = st.selectbox("Format", list(exports.FORMATS))
+        prepare = st.form_submit_button("Prepare Export", use_container_width=True)
+    
+    if prepare and len(date_range) == 1:
+        st.warning("Pick an end date too, or clear the dates to export everything")
+    elif prepare:
+        # Only one prepared file per session is kept on disk; files left by
+        # ended sessions are removed by age in exports.export_tasks
+        previous = st.session_state.pop("export_file", None)
+        if previous and os.path.exists(previous["path"]):
+            os.remove(previous["path"])
+        created_from = created_to = None
+        if len(date_range) == 2:
+            created_from = date_range[0].isoformat()
+            created_to = (date_range[1] + timedelta(days=1)).isoformat()
+        with st.spinner("Exporting..."):
+            path, counts = exports.export_tasks(
+                exports.FORMATS[fmt],
+                created_from=created_from,
+                created_to=created_to,
+                assignee_id=assignee['id'] if assignee else None,
+                status=repository.STATUS_FILTERS[status_filter],
+            )
+        st.session_state.export_file = {
+            "path": path,
+            "name": f"tasks_{datetime.now():%Y%m%d_%H%M}.{exports.FORMATS[fmt]}",
+            "counts": counts,
+        }
+    
+    export_file = st.session_state.get("export_file")
+    if export_file and os.path.exists(export_file["path"]):
+        counts = export_file["counts"]
+        st.success(f"{counts['tasks']} tasks, {counts['followups']} follow-ups, "
+                   f"{counts['attachments']} attachments")
+        with open(export_file["path"], "rb") as f:
+            st.download_button("⬇️ Download Export", f, file_name=export_file["name"],
+                               use_container_width=True, key="export_download")
 
 # ==========================================
 # LOGIN SYSTEM
@@ -283,7 +916,7 @@ if "user" not in st.session_state:
             Work Management System
         </p>
     </div>
-    """.format(base64.b64encode(open("logo_alraed_Security.png", "rb").read()).decode() if os.path.exists("logo_alraed_Security.png") else ""), unsafe_allow_html=True)
+    """.format(assets.LOGO_BASE64), unsafe_allow_html=True)
     
     st.markdown("<br>", unsafe_allow_html=True)
     
@@ -311,15 +944,14 @@ if "user" not in st.session_state:
             if submit:
                 if user_username and user_password:
                     try:
-                        res = supabase.table("UsersTable").select("*").eq("username", user_username).eq("password", user_password).execute()
-                        if res.data:
-                            user_data = res.data[0]
+                        user_data = repository.authenticate(user_username, user_password)
+                        if user_data:
                             if user_data.get("status") == "pending":
                                 st.warning("Account pending approval")
                             elif user_data.get("status") == "rejected":
                                 st.error("Account access denied")
                             else:
-                                st.session_state.user = {"name": user_data["full_name"], "role": str(user_data["role"]).strip()}
+                                st.session_state.user = {"id": user_data["id"], "name": user_data["full_name"], "role": str(user_data["role"]).strip()}
                                 st.session_state.selected_task = None
                                 st.success(f"Welcome, {user_data['full_name']}")
                                 st.rerun()
@@ -349,8 +981,7 @@ if "user" not in st.session_state:
                 if register_btn:
                     if reg_name and reg_username:
                         try:
-                            existing = supabase.table("UsersTable").select("*").eq("username", reg_username).execute()
-                            if existing.data:
+                            if repository.username_exists(reg_username):
                                 st.error("Username already taken")
                             else:
                                 temp_password = generate_temp_password()
@@ -360,7 +991,7 @@ if "user" not in st.session_state:
                                     "phone": reg_phone, "department": reg_department,
                                     "requested_at": datetime.now().isoformat()
                                 }
-                                supabase.table("UsersTable").insert(new_user).execute()
+                                repository.register_user(new_user)
                                 st.success("✅ Request submitted! Wait for admin approval.")
                                 st.balloons()  # Celebration animation!
                         except Exception as e:
@@ -378,11 +1009,8 @@ curr_user = st.session_state.user
 # Header
 col1, col2, col3 = st.columns([1, 6, 1])
 with col1:
-    try:
-        logo = Image.open("logo_alraed_Security.png")
-        st.image(logo, width=50)
-    except:
-        pass
+    if assets.LOGO_BYTES:
+        st.image(assets.LOGO_BYTES, width=50)
 with col2:
     st.markdown(f"""
     <div style='padding: 0.5rem 0;'>
@@ -404,332 +1032,43 @@ with col3:
 st.markdown("<hr style='margin: 1rem 0; border: none; border-top: 1px solid #e2e8f0;'>", unsafe_allow_html=True)
 
 # BOSS: Show tabs for Tasks and User Management
-if curr_user["role"].lower() == "boss":
-    main_tab1, main_tab2 = st.tabs(["Tasks", "User Management"])
+if is_boss(curr_user):
+    main_tab1, main_tab2, main_tab3, main_tab4 = st.tabs(["Tasks", "User Management", "Analytics", "Export"])
     
     # ==========================================
     # BOSS TAB 1: TASKS
     # ==========================================
     with main_tab1:
-        # Get tasks
-        all_tasks = supabase.table("TasksTable").select("*").order("deadline").execute().data or []
-        
         # KPI Cards
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            active = len([t for t in all_tasks if t.get('status') == 'Pending'])
-            st.markdown(f"""
-            <div class="kpi-card">
-                <div class="kpi-value">{active}</div>
-                <div class="kpi-label">ACTIVE TASKS</div>
-            </div>
-            """, unsafe_allow_html=True)
-        with col2:
-            completed = len([t for t in all_tasks if t.get('status') == 'Finished'])
-            st.markdown(f"""
-            <div class="kpi-card">
-                <div class="kpi-value">{completed}</div>
-                <div class="kpi-label">COMPLETED</div>
-            </div>
-            """, unsafe_allow_html=True)
-        with col3:
-            high_priority = len([t for t in all_tasks if t.get('priority') == 'High'])
-            st.markdown(f"""
-            <div class="kpi-card">
-                <div class="kpi-value">{high_priority}</div>
-                <div class="kpi-label">HIGH PRIORITY</div>
-            </div>
-            """, unsafe_allow_html=True)
-        with col4:
-            total = len(all_tasks)
-            st.markdown(f"""
-            <div class="kpi-card">
-                <div class="kpi-value">{total}</div>
-                <div class="kpi-label">TOTAL TASKS</div>
-            </div>
-            """, unsafe_allow_html=True)
+        render_kpi_cards(repository.get_task_kpis())
         
         st.markdown("<br>", unsafe_allow_html=True)
         
         # Two-Column Layout
-        col_list, col_detail = st.columns([2, 3])
-        
-        # LEFT: Task List
-        with col_list:
-            st.markdown('<div class="section-header">TASK LIST</div>', unsafe_allow_html=True)
-            
-            # Create New Task for Boss
-            with st.expander("➕ Create New Task"):
-                with st.form("boss_create_task", clear_on_submit=True):
-                    task_title = st.text_input("", placeholder="Task title", label_visibility="collapsed")
-                    
-                    col_t1, col_t2 = st.columns(2)
-                    with col_t1:
-                        task_deadline = st.date_input("Deadline", label_visibility="collapsed")
-                    with col_t2:
-                        task_priority = st.selectbox("Priority", ["Low", "Medium", "High"], label_visibility="collapsed")
-                    
-                    # Get all users for assignment
-                    all_users_list = supabase.table("UsersTable").select("full_name").eq("status", "active").execute().data or []
-                    user_names = [u['full_name'] for u in all_users_list if u.get('full_name')]
-                    
-                    task_assign = st.selectbox("Assign to", user_names if user_names else ["No users available"], label_visibility="collapsed")
-                    
-                    if st.form_submit_button("Create Task", use_container_width=True):
-                        if task_title and task_assign:
-                            result = supabase.table("TasksTable").insert({
-                                "title": task_title,
-                                "deadline": str(task_deadline),
-                                "priority": task_priority,
-                                "status": "Pending",
-                                "assigned_to": task_assign
-                            }).execute()
-                            if result.data:
-                                st.success(f"Task created and assigned to {task_assign}!")
-                                st.session_state.selected_task = result.data[0]['id']
-                                st.rerun()
-                        else:
-                            st.error("Title and assignment required")
-            
-            st.markdown("<br>", unsafe_allow_html=True)
-            
-            # Filter and Sort
-            col_f1, col_f2 = st.columns(2)
-            with col_f1:
-                filter_status = st.selectbox("Filter", ["All Tasks", "Pending Only", "Completed Only"], label_visibility="collapsed")
-            with col_f2:
-                sort_by = st.selectbox("Sort", ["Deadline", "Priority", "Name", "Status"], label_visibility="collapsed")
-            
-            # Apply filter
-            if filter_status == "Pending Only":
-                filtered_tasks = [t for t in all_tasks if t.get('status') == 'Pending']
-            elif filter_status == "Completed Only":
-                filtered_tasks = [t for t in all_tasks if t.get('status') == 'Finished']
-            else:
-                filtered_tasks = all_tasks
-            
-            # Apply sort
-            if sort_by == "Priority":
-                priority_order = {"High": 1, "Medium": 2, "Low": 3}
-                filtered_tasks = sorted(filtered_tasks, key=lambda x: priority_order.get(x.get('priority', 'Medium'), 2))
-            elif sort_by == "Name":
-                filtered_tasks = sorted(filtered_tasks, key=lambda x: x.get('assigned_to', '').lower())
-            elif sort_by == "Status":
-                filtered_tasks = sorted(filtered_tasks, key=lambda x: x.get('status', ''))
-            # Deadline is default (already sorted from query)
-            
-            st.markdown("<br>", unsafe_allow_html=True)
-            
-            # Task rows
-            if filtered_tasks:
-                for task in filtered_tasks:
-                    priority_class = f"priority-{task.get('priority', 'medium').lower()}"
-                    
-                    if st.button(f"{task['title']}", key=f"task_{task['id']}", use_container_width=True):
-                        st.session_state.selected_task = task['id']
-                        st.rerun()
-                    
-                    st.markdown(f"""
-                    <div style='margin-top: -0.5rem; margin-bottom: 1rem; padding-left: 1rem; font-size: 0.8125rem; color: #718096;'>
-                        <span class='priority-dot {priority_class}'></span>
-                        {task.get('priority', 'Medium')} • {task.get('assigned_to', 'N/A')} • Due: {task.get('deadline', 'N/A')} • {task.get('status', 'Pending')}
-                    </div>
-                    """, unsafe_allow_html=True)
-            else:
-                st.info("No tasks found")
-        
-        # RIGHT: Task Detail
-        with col_detail:
-            st.markdown('<div class="section-header">TASK DETAILS</div>', unsafe_allow_html=True)
-            
-            selected_id = st.session_state.get('selected_task')
-            if selected_id and all_tasks:
-                task = next((t for t in all_tasks if t['id'] == selected_id), None)
-                if task:
-                    # Task info with priority selector for boss
-                    col_title, col_priority = st.columns([2, 1])
-                    with col_title:
-                        st.markdown(f"### {task['title']}")
-                    with col_priority:
-                        new_priority = st.selectbox("Priority", ["Low", "Medium", "High"], 
-                                                   index=["Low", "Medium", "High"].index(task.get('priority', 'Medium')),
-                                                   key=f"prio_{task['id']}")
-                        if new_priority != task.get('priority'):
-                            if st.button("Update", key=f"upd_prio_{task['id']}"):
-                                supabase.table("TasksTable").update({"priority": new_priority}).eq("id", task['id']).execute()
-                                st.success("Priority updated!")
-                                st.rerun()
-                    
-                    st.markdown(f"""
-                    <div style='margin: 1rem 0;'>
-                        <span class='status-badge status-{task.get('status', 'pending').lower()}'>{task.get('status', 'Pending')}</span>
-                        <span class='status-badge' style='background: #edf2f7; color: #2d3748;'>Assigned: {task.get('assigned_to', 'N/A')}</span>
-                        <span class='status-badge' style='background: #edf2f7; color: #2d3748;'>Due: {task.get('deadline', 'N/A')}</span>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    st.markdown("<hr style='margin: 1.5rem 0; border-top: 1px solid #e2e8f0;'>", unsafe_allow_html=True)
-                    
-                    # Activity log
-                    st.markdown("**Activity Log:**")
-                    activities = supabase.table("FollowupsTable").select("*").eq("task_id", task['id']).order("id", desc=True).execute().data or []
-                    if activities:
-                        for act in activities:
-                            st.markdown(f"""
-                            <div class='activity-item'>
-                                <div class='activity-author'>{act.get('author_name', 'Unknown')}</div>
-                                <div class='activity-content'>{act.get('content', '')}</div>
-                            </div>
-                            """, unsafe_allow_html=True)
-                    else:
-                        st.caption("No activity yet")
-                    
-                    st.markdown("<hr style='margin: 1.5rem 0; border-top: 1px solid #e2e8f0;'>", unsafe_allow_html=True)
-                    
-                    # Boss actions
-                    with st.form("boss_update", clear_on_submit=True):
-                        update_text = st.text_area("", placeholder="Add comment...", label_visibility="collapsed")
-                        if st.form_submit_button("Add Comment", use_container_width=True):
-                            if update_text:
-                                supabase.table("FollowupsTable").insert({
-                                    "task_id": task['id'],
-                                    "author_name": f"BOSS: {curr_user['name']}",
-                                    "content": update_text
-                                }).execute()
-                                st.success("Comment added!")
-                                st.rerun()
-                    
-                    # Delete Task Button
-                    st.markdown("<br>", unsafe_allow_html=True)
-                    col_del1, col_del2, col_del3 = st.columns([1, 2, 1])
-                    with col_del2:
-                        if st.button("🗑️ Delete Task", key=f"del_{task['id']}", use_container_width=True, type="secondary"):
-                            # Delete followups first
-                            supabase.table("FollowupsTable").delete().eq("task_id", task['id']).execute()
-                            # Delete files
-                            supabase.table("TaskFilesTable").delete().eq("task_id", task['id']).execute()
-                            # Delete task
-                            supabase.table("TasksTable").delete().eq("id", task['id']).execute()
-                            st.session_state.selected_task = None
-                            st.success("Task deleted!")
-                            st.rerun()
-                    
-                    # File upload for boss
-                    st.markdown("<br>", unsafe_allow_html=True)
-                    st.markdown("**Upload Project Files:**")
-                    with st.form(f"boss_file_upload_{task['id']}", clear_on_submit=True):
-                        uploaded_files = st.file_uploader("", accept_multiple_files=True, label_visibility="collapsed", key=f"boss_upload_{task['id']}")
-                        if st.form_submit_button("Upload Files", use_container_width=True):
-                            if uploaded_files:
-                                for file in uploaded_files:
-                                    success, msg = save_file_to_database(file, task['id'], f"BOSS: {curr_user['name']}")
-                                    if success:
-                                        st.success(f"Uploaded: {file.name}")
-                                st.rerun()
-                            else:
-                                st.warning("Please select files first")
-                    
-                    # Show files
-                    files = get_task_files(task['id'])
-                    if files:
-                        st.markdown("<hr style='margin: 1.5rem 0; border-top: 1px solid #e2e8f0;'>", unsafe_allow_html=True)
-                        st.markdown("**Attached Files:**")
-                        for file in files:
-                            col_f1, col_f2, col_f3 = st.columns([3, 1, 1])
-                            with col_f1:
-                                st.markdown(f"{get_file_icon(file['file_name'])} {file['file_name']} ({format_file_size(file['file_size'])})")
-                            with col_f2:
-                                st.markdown(create_download_link(file['file_data'], file['file_name'], file['file_type']), unsafe_allow_html=True)
-                            with col_f3:
-                                if st.button("Delete", key=f"del_file_boss_{file['id']}", type="secondary"):
-                                    supabase.table("TaskFilesTable").delete().eq("id", file['id']).execute()
-                                    st.success("File deleted!")
-                                    st.rerun()
-                else:
-                    st.info("Task not found")
-            else:
-                st.info("Select a task from the list")
+        task_workspace(curr_user)
     
     # ==========================================
     # BOSS TAB 2: USER MANAGEMENT
     # ==========================================
     with main_tab2:
-        st.markdown('<div class="section-header">USER MANAGEMENT</div>', unsafe_allow_html=True)
-        
-        all_users = supabase.table("UsersTable").select("*").execute().data or []
-        pending_users = [u for u in all_users if u.get('status') == 'pending']
-        active_users = [u for u in all_users if u.get('status') == 'active']
-        
-        user_sub_tabs = st.tabs([f"Pending ({len(pending_users)})", f"Active ({len(active_users)})"])
-        
-        # Pending users
-        with user_sub_tabs[0]:
-            # Show recently approved users first
-            if 'recently_approved' in st.session_state and st.session_state.recently_approved:
-                with st.container(border=True):
-                    st.success("✅ User Successfully Approved!")
-                    approval_info = st.session_state.recently_approved
-                    st.markdown(f"""
-**Login Credentials to Share:**
-
-- **Name:** {approval_info['name']}
-- **Username:** `{approval_info['username']}`
-- **Password:** `{approval_info['password']}`
-
-*Please provide these credentials to the user.*
-                    """)
-                    if st.button("Clear Message", key="clear_approval"):
-                        st.session_state.recently_approved = None
-                        st.rerun()
-                st.markdown("---")
-            
-            if pending_users:
-                for user in pending_users:
-                    with st.container(border=True):
-                        col1, col2 = st.columns([3, 1])
-                        with col1:
-                            st.markdown(f"**{user['full_name']}**")
-                            st.markdown(f"Username: `{user.get('username', 'N/A')}`")
-                            st.markdown(f"Email: {user.get('email', 'N/A')}")
-                            st.markdown(f"Department: {user.get('department', 'N/A')}")
-                        with col2:
-                            if st.button("Approve", key=f"app_{user['id']}", use_container_width=True):
-                                supabase.table("UsersTable").update({"status": "active"}).eq("id", user['id']).execute()
-                                # Store approval info in session state
-                                st.session_state.recently_approved = {
-                                    'name': user['full_name'],
-                                    'username': user.get('username', 'N/A'),
-                                    'password': user['password']
-                                }
-                                st.rerun()
-                            if st.button("Reject", key=f"rej_{user['id']}", use_container_width=True):
-                                supabase.table("UsersTable").update({"status": "rejected"}).eq("id", user['id']).execute()
-                                st.rerun()
-            else:
-                st.info("No pending requests")
-        
-        # Active users
-        with user_sub_tabs[1]:
-            if active_users:
-                for user in active_users:
-                    with st.expander(f"{user['full_name']} - {user.get('role', 'staff')}"):
-                        st.markdown(f"Username: `{user.get('username')}`")
-                        st.markdown(f"Password: `{user['password']}`")
-                        st.markdown(f"Role: {user.get('role')}")
-                        if st.button("Reset Password", key=f"reset_{user['id']}"):
-                            new_pass = generate_temp_password()
-                            supabase.table("UsersTable").update({"password": new_pass}).eq("id", user['id']).execute()
-                            st.success(f"New password: `{new_pass}`")
-            else:
-                st.info("No active users")
+        user_management()
+    
+    # ==========================================
+    # BOSS TAB 3: ANALYTICS
+    # ==========================================
+    with main_tab3:
+        analytics_panel()
+    
+    # ==========================================
+    # BOSS TAB 4: EXPORT
+    # ==========================================
+    with main_tab4:
+        export_panel()
 
 # ==========================================
 # STAFF VIEW
 # ==========================================
 else:
-    # Get staff tasks
-    all_tasks = supabase.table("TasksTable").select("*").ilike("assigned_to", curr_user["name"]).order("deadline").execute().data or []
-    
     staff_tabs = st.tabs(["Tasks", "Change Password"])
     
     # ==========================================
@@ -737,188 +1076,12 @@ else:
     # ==========================================
     with staff_tabs[0]:
         # KPI Cards
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            active = len([t for t in all_tasks if t.get('status') == 'Pending'])
-            st.markdown(f"""
-            <div class="kpi-card">
-                <div class="kpi-value">{active}</div>
-                <div class="kpi-label">ACTIVE TASKS</div>
-            </div>
-            """, unsafe_allow_html=True)
-        with col2:
-            completed = len([t for t in all_tasks if t.get('status') == 'Finished'])
-            st.markdown(f"""
-            <div class="kpi-card">
-                <div class="kpi-value">{completed}</div>
-                <div class="kpi-label">COMPLETED</div>
-            </div>
-            """, unsafe_allow_html=True)
-        with col3:
-            high_priority = len([t for t in all_tasks if t.get('priority') == 'High'])
-            st.markdown(f"""
-            <div class="kpi-card">
-                <div class="kpi-value">{high_priority}</div>
-                <div class="kpi-label">HIGH PRIORITY</div>
-            </div>
-            """, unsafe_allow_html=True)
-        with col4:
-            total = len(all_tasks)
-            st.markdown(f"""
-            <div class="kpi-card">
-                <div class="kpi-value">{total}</div>
-                <div class="kpi-label">TOTAL TASKS</div>
-            </div>
-            """, unsafe_allow_html=True)
+        render_kpi_cards(repository.get_task_kpis(curr_user["id"]))
         
         st.markdown("<br>", unsafe_allow_html=True)
         
         # Two-Column Layout
-        col_list, col_detail = st.columns([2, 3])
-        
-        # LEFT: Task List
-        with col_list:
-            st.markdown('<div class="section-header">MY TASKS</div>', unsafe_allow_html=True)
-            
-            # Quick add
-            with st.expander("➕ Create New Task"):
-                with st.form("quick_add", clear_on_submit=True):
-                    title = st.text_input("", placeholder="Task title")
-                    deadline = st.date_input("Deadline")
-                    priority = st.selectbox("Priority", ["Low", "Medium", "High"])
-                    if st.form_submit_button("Create"):
-                        if title:
-                            supabase.table("TasksTable").insert({
-                                "title": title, "deadline": str(deadline), "priority": priority,
-                                "status": "Pending", "assigned_to": curr_user["name"]
-                            }).execute()
-                            st.success("Task created!")
-                            st.balloons()
-                            st.rerun()
-            
-            st.markdown("<br>", unsafe_allow_html=True)
-            
-            # Sort option for staff
-            sort_by = st.selectbox("Sort by", ["Deadline", "Priority", "Status"], label_visibility="collapsed")
-            
-            # Apply sort
-            if sort_by == "Priority":
-                priority_order = {"High": 1, "Medium": 2, "Low": 3}
-                all_tasks = sorted(all_tasks, key=lambda x: priority_order.get(x.get('priority', 'Medium'), 2))
-            elif sort_by == "Status":
-                all_tasks = sorted(all_tasks, key=lambda x: x.get('status', ''))
-            # Deadline is default (already sorted from query)
-            
-            st.markdown("<br>", unsafe_allow_html=True)
-            
-            # Task rows
-            if all_tasks:
-                for task in all_tasks:
-                    priority_class = f"priority-{task.get('priority', 'medium').lower()}"
-                    
-                    if st.button(f"{task['title']}", key=f"task_{task['id']}", use_container_width=True):
-                        st.session_state.selected_task = task['id']
-                        st.rerun()
-                    
-                    st.markdown(f"""
-                    <div style='margin-top: -0.5rem; margin-bottom: 1rem; padding-left: 1rem; font-size: 0.8125rem; color: #718096;'>
-                        <span class='priority-dot {priority_class}'></span>
-                        {task.get('priority', 'Medium')} • Due: {task.get('deadline', 'N/A')} • {task.get('status', 'Pending')}
-                    </div>
-                    """, unsafe_allow_html=True)
-            else:
-                st.info("No tasks found")
-        
-        # RIGHT: Task Detail
-        with col_detail:
-            st.markdown('<div class="section-header">TASK DETAILS</div>', unsafe_allow_html=True)
-            
-            selected_id = st.session_state.get('selected_task')
-            if selected_id and all_tasks:
-                task = next((t for t in all_tasks if t['id'] == selected_id), None)
-                if task:
-                    st.markdown(f"### {task['title']}")
-                    st.markdown(f"""
-                    <div style='margin: 1rem 0;'>
-                        <span class='status-badge status-{task.get('status', 'pending').lower()}'>{task.get('status', 'Pending')}</span>
-                        <span class='status-badge' style='background: #edf2f7; color: #2d3748;'>Priority: {task.get('priority', 'Medium')}</span>
-                        <span class='status-badge' style='background: #edf2f7; color: #2d3748;'>Due: {task.get('deadline', 'N/A')}</span>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    st.markdown("<hr style='margin: 1.5rem 0; border-top: 1px solid #e2e8f0;'>", unsafe_allow_html=True)
-                    
-                    # Activity log
-                    st.markdown("**Activity Log:**")
-                    activities = supabase.table("FollowupsTable").select("*").eq("task_id", task['id']).order("id", desc=True).execute().data or []
-                    if activities:
-                        for act in activities:
-                            st.markdown(f"""
-                            <div class='activity-item'>
-                                <div class='activity-author'>{act.get('author_name', 'Unknown')}</div>
-                                <div class='activity-content'>{act.get('content', '')}</div>
-                            </div>
-                            """, unsafe_allow_html=True)
-                    else:
-                        st.caption("No activity yet")
-                    
-                    st.markdown("<hr style='margin: 1.5rem 0; border-top: 1px solid #e2e8f0;'>", unsafe_allow_html=True)
-                    
-                    # Actions
-                    if task.get('status') != 'Finished':
-                        with st.form("add_update", clear_on_submit=True):
-                            update_text = st.text_area("", placeholder="Add progress update...", label_visibility="collapsed")
-                            col_a, col_b = st.columns(2)
-                            with col_a:
-                                if st.form_submit_button("Add Update", use_container_width=True):
-                                    if update_text:
-                                        supabase.table("FollowupsTable").insert({
-                                            "task_id": task['id'],
-                                            "author_name": curr_user['name'],
-                                            "content": update_text
-                                        }).execute()
-                                        st.success("Update added!")
-                                        st.rerun()
-                            with col_b:
-                                if st.form_submit_button("Mark Complete", use_container_width=True):
-                                    supabase.table("TasksTable").update({"status": "Finished"}).eq("id", task['id']).execute()
-                                    st.success("Task completed!")
-                                    st.balloons()
-                                    st.rerun()
-                        
-                        # File upload
-                        st.markdown("<br>", unsafe_allow_html=True)
-                        with st.form(f"staff_file_upload_{task['id']}", clear_on_submit=True):
-                            uploaded_files = st.file_uploader("Upload files", accept_multiple_files=True, label_visibility="collapsed")
-                            if st.form_submit_button("Upload", use_container_width=True):
-                                if uploaded_files:
-                                    for file in uploaded_files:
-                                        save_file_to_database(file, task['id'], curr_user['name'])
-                                    st.success("Files uploaded!")
-                                    st.rerun()
-                                else:
-                                    st.warning("Please select files first")
-                    
-                    # Show files
-                    files = get_task_files(task['id'])
-                    if files:
-                        st.markdown("<hr style='margin: 1.5rem 0; border-top: 1px solid #e2e8f0;'>", unsafe_allow_html=True)
-                        st.markdown("**Attached Files:**")
-                        for file in files:
-                            col_f1, col_f2, col_f3 = st.columns([3, 1, 1])
-                            with col_f1:
-                                st.markdown(f"{get_file_icon(file['file_name'])} {file['file_name']} ({format_file_size(file['file_size'])})")
-                            with col_f2:
-                                st.markdown(create_download_link(file['file_data'], file['file_name'], file['file_type']), unsafe_allow_html=True)
-                            with col_f3:
-                                if st.button("Delete", key=f"del_file_staff_{file['id']}", type="secondary"):
-                                    supabase.table("TaskFilesTable").delete().eq("id", file['id']).execute()
-                                    st.success("File deleted!")
-                                    st.rerun()
-                else:
-                    st.info("Task not found")
-            else:
-                st.info("Select a task from the list")
+        task_workspace(curr_user)
     
     # ==========================================
     # STAFF TAB 2: CHANGE PASSWORD
@@ -940,11 +1103,19 @@ else:
                         elif len(new_pass) < 6:
                             st.error("Password must be at least 6 characters")
                         else:
-                            user_data = supabase.table("UsersTable").select("*").eq("full_name", curr_user["name"]).execute()
-                            if user_data.data and user_data.data[0]['password'] == current_pass:
-                                supabase.table("UsersTable").update({"password": new_pass}).eq("id", user_data.data[0]['id']).execute()
+                            user_data = repository.get_user(curr_user["id"])
+                            if user_data and user_data['password'] == current_pass:
+                                repository.set_user_password(user_data['id'], new_pass)
                                 st.success("Password changed successfully!")
                             else:
                                 st.error("Current password is incorrect")
                     else:
                         st.error("Please fill all fields")
+
+# ==========================================
+# DIAGNOSTICS
+# ==========================================
+instrumentation.configure_export(bool(st.secrets.get("PERF_LOG", False)))
+perf_run = instrumentation.finish_run(export=bool(st.secrets.get("PERF_LOG", False)))
+if perf_run and is_boss(curr_user):
+    render_diagnostics(perf_run)
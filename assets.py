@@ -0,0 +1,205 @@
+import base64
+import os
+
+# ==========================================
+# STATIC ASSETS
+# ==========================================
+# Loaded once when the module is first imported (once per server process)
+# and reused by every session and rerun.
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+LOGO_PATH = os.path.join(ASSET_DIR, "logo_alraed_Security.png")
+
+
+def _read_bytes(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return b""
+
+
+LOGO_BYTES = _read_bytes(LOGO_PATH)
+LOGO_BASE64 = base64.b64encode(LOGO_BYTES).decode() if LOGO_BYTES else ""
+
+# ==========================================
+# EXECUTIVE COMMAND CENTER CSS
+# ==========================================
+APP_CSS = """
+<style>
+    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
+    
+    * { font-family: 'Inter', sans-serif; }
+    
+    .stApp { background: #fafbfc; }
+    
+    #MainMenu, footer, header { visibility: hidden; }
+    .block-container { padding: 1.5rem 2rem; max-width: 100%; }
+    
+    /* KPI Cards */
+    .kpi-card {
+        background: white;
+        border: 1px solid #e2e8f0;
+        border-radius: 6px;
+        padding: 1rem 1.25rem;
+        text-align: center;
+    }
+    .kpi-value {
+        font-size: 2rem;
+        font-weight: 700;
+        color: #2d3748;
+        margin: 0;
+    }
+    .kpi-label {
+        font-size: 0.8125rem;
+        color: #718096;
+        margin-top: 0.25rem;
+        font-weight: 500;
+    }
+    
+    /* Task Row */
+    .task-row {
+        padding: 0.875rem 1rem;
+        border-bottom: 1px solid #e2e8f0;
+        cursor: pointer;
+        transition: background 0.1s;
+    }
+    .task-row:hover {
+        background: #f7fafc;
+    }
+    .task-row.selected {
+        background: #edf2f7;
+        border-left: 3px solid #9f7928;
+    }
+    .task-title {
+        font-size: 0.9375rem;
+        font-weight: 500;
+        color: #2d3748;
+        margin-bottom: 0.25rem;
+    }
+    .task-meta {
+        font-size: 0.8125rem;
+        color: #718096;
+    }
+    
+    /* Priority Dots */
+    .priority-dot {
+        display: inline-block;
+        width: 8px;
+        height: 8px;
+        border-radius: 50%;
+        margin-right: 0.5rem;
+    }
+    .priority-high { background: #e53e3e; }
+    .priority-medium { background: #ed8936; }
+    .priority-low { background: #48bb78; }
+    
+    /* Clean Inputs */
+    .stTextInput > div > div > input,
+    .stTextArea > div > div > textarea {
+        border: 1px solid #e2e8f0 !important;
+        border-radius: 6px !important;
+        padding: 0.625rem 0.875rem !important;
+        font-size: 0.9375rem !important;
+    }
+    
+    .stTextInput > div > div > input:focus,
+    .stTextArea > div > div > textarea:focus {
+        border-color: #9f7928 !important;
+        box-shadow: 0 0 0 1px #9f7928 !important;
+    }
+    
+    /* Clean Buttons */
+    .stButton > button {
+        background: #9f7928 !important;
+        color: white !important;
+        border: none !important;
+        border-radius: 6px !important;
+        padding: 0.625rem 1.25rem !important;
+        font-size: 0.9375rem !important;
+        font-weight: 500 !important;
+        transition: background 0.15s !important;
+    }
+    
+    .stButton > button:hover {
+        background: #8a6a24 !important;
+    }
+    
+    /* Section Headers */
+    .section-header {
+        font-size: 0.875rem;
+        font-weight: 600;
+        color: #4a5568;
+        text-transform: uppercase;
+        letter-spacing: 0.5px;
+        margin-bottom: 1rem;
+        padding-bottom: 0.5rem;
+        border-bottom: 1px solid #e2e8f0;
+    }
+    
+    /* Detail Panel */
+    .detail-panel {
+        background: white;
+        border: 1px solid #e2e8f0;
+        border-radius: 6px;
+        padding: 1.5rem;
+        min-height: 600px;
+    }
+    
+    /* Activity Item */
+    .activity-item {
+        padding: 0.75rem;
+        background: #f7fafc;
+        border-left: 2px solid #e2e8f0;
+        margin-bottom: 0.75rem;
+        border-radius: 4px;
+    }
+    .activity-author {
+        font-weight: 600;
+        color: #2d3748;
+        font-size: 0.875rem;
+    }
+    .activity-content {
+        color: #4a5568;
+        font-size: 0.875rem;
+        margin-top: 0.25rem;
+    }
+    
+    /* Status Badges */
+    .status-badge {
+        display: inline-block;
+        padding: 0.25rem 0.625rem;
+        border-radius: 4px;
+        font-size: 0.8125rem;
+        font-weight: 500;
+    }
+    .status-pending { background: #bee3f8; color: #2c5282; }
+    .status-finished { background: #c6f6d5; color: #22543d; }
+    
+    /* Remove labels */
+    .stTextInput > label,
+    .stTextArea > label,
+    .stSelectbox > label { display: none !important; }
+    
+    /* Tabs - Login Only */
+    .stTabs [data-baseweb="tab-list"] {
+        gap: 0;
+        background: transparent;
+        border-bottom: 1px solid #e2e8f0;
+        justify-content: center;
+    }
+    
+    .stTabs [data-baseweb="tab"] {
+        background: transparent;
+        color: #718096;
+        font-weight: 500;
+        padding: 0.875rem 2rem;
+        border-bottom: 2px solid transparent;
+    }
+    
+    .stTabs [data-baseweb="tab"][aria-selected="true"] {
+        color: #2d3748;
+        font-weight: 600;
+        border-bottom-color: #9f7928;
+    }
+</style>
+"""
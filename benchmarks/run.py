@@ -0,0 +1,218 @@
+"""Drive app.py headlessly through the common flows and record rerun cost.
+
+    python -m benchmarks.seed --db bench.db --blobs bench_blobs
+    python -m benchmarks.run --db bench.db --blobs bench_blobs --out bench.json
+    python -m benchmarks.run ... --compare previous.json
+
+Each flow runs once with cold caches and once warm. For every run the wall
+time, number of backend queries and bytes returned are recorded. Some flows
+write (comments, approvals), so re-seed before runs that will be compared.
+AppTest re-executes the whole script for every interaction, fragments
+included, so timings are an upper bound on what a browser session sees.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from streamlit.testing.v1 import AppTest
+
+import instrumentation
+import repository
+import storage
+from benchmarks.seed import BOSS
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def clear_caches():
+    for value in vars(repository).values():
+        if isinstance(value, (repository.QueryCache, repository.ByteLRUCache)):
+            value.clear()
+
+
+# ==========================================
+# FLOWS
+# ==========================================
+def new_app(args, user=None):
+    at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+    at.secrets["STORAGE_BACKEND"] = "sqlite"
+    at.secrets["SQLITE_PATH"] = args.db
+    at.secrets["BLOB_ROOT"] = args.blobs
+    # Background writes would skew the query counts
+    at.secrets["SCHEDULER"] = "off"
+    if user:
+        at.session_state["user"] = user
+    return at
+
+
+def button(at, label=None, key=None):
+    for b in at.button:
+        if (key is not None and b.key == key) or (label is not None and b.label == label):
+            return b
+    raise LookupError(f"No button {label or key}")
+
+
+def _user(args, role):
+    backend = storage.SQLiteBackend(args.db)
+    row = backend.table("UsersTable").select("id, full_name").eq("role", role).eq("status", "active").limit(1).execute().data[0]
+    return {"id": row["id"], "name": row["full_name"], "role": role}
+
+
+def boss_user(args):
+    return _user(args, "boss")
+
+
+def staff_user(args):
+    return _user(args, "staff")
+
+
+def first_task_id(at):
+    for b in at.button:
+        if b.key and b.key.startswith("task_"):
+            return int(b.key.split("_", 1)[1])
+    raise LookupError("No task rows rendered")
+
+
+def flow_login(args, step):
+    at = new_app(args)
+    step("render", at.run)
+    at.text_input[0].input(BOSS["username"])
+    at.text_input[1].input(BOSS["password"])
+    step("sign_in", button(at, label="Sign In").click().run)
+
+
+def flow_boss_task_list(args, step):
+    at = new_app(args, boss_user(args))
+    step("render", at.run)
+    for status in repository.STATUS_FILTERS:
+        for sort_by in repository.TASK_SORTS:
+            at.selectbox(key="boss_filter").select(status)
+            at.selectbox(key="boss_sort").select(sort_by)
+            step(f"{status}/{sort_by}", at.run)
+
+
+def flow_boss_select_task(args, step):
+    at = new_app(args, boss_user(args))
+    at.run()
+    step("select", button(at, key=f"task_{first_task_id(at)}").click().run)
+
+
+def flow_boss_add_comment(args, step):
+    at = new_app(args, boss_user(args))
+    at.run()
+    button(at, key=f"task_{first_task_id(at)}").click().run()
+    at.text_area[0].input("Benchmark comment")
+    step("add_comment", button(at, label="Add Comment").click().run)
+
+
+def flow_staff_view(args, step):
+    at = new_app(args, staff_user(args))
+    step("render", at.run)
+    step("select", button(at, key=f"task_{first_task_id(at)}").click().run)
+
+
+def flow_user_management(args, step):
+    at = new_app(args, boss_user(args))
+    step("render", at.run)
+    approve = next((b for b in at.button if b.key and b.key.startswith("app_")), None)
+    if approve:
+        step("approve", approve.click().run)
+
+
+FLOWS = {
+    "login": flow_login,
+    "boss_task_list": flow_boss_task_list,
+    "boss_select_task": flow_boss_select_task,
+    "boss_add_comment": flow_boss_add_comment,
+    "staff_view": flow_staff_view,
+    "user_management": flow_user_management,
+}
+
+
+def run_flow(args, flow):
+    steps = []
+    runs = []
+
+    def step(name, fn):
+        # Only queries attributed to the app's own script runs count; the
+        # process-wide metrics also see background threads (analytics
+        # snapshots, prefetch, search index builds) at unpredictable times
+        runs.clear()
+        start = time.perf_counter()
+        at = fn()
+        elapsed = time.perf_counter() - start
+        if at is not None and at.exception:
+            raise RuntimeError(f"{name}: {at.exception[0].message}")
+        totals = [run.totals() for run in runs]
+        steps.append({"step": name, "seconds": round(elapsed, 4),
+                      "queries": sum(t["queries"] for t in totals), "bytes": sum(t["bytes"] for t in totals)})
+
+    instrumentation.add_run_listener(runs.append)
+    try:
+        flow(args, step)
+    finally:
+        instrumentation.remove_run_listener(runs.append)
+    return {
+        "seconds": round(sum(s["seconds"] for s in steps), 4),
+        "queries": sum(s["queries"] for s in steps),
+        "bytes": sum(s["bytes"] for s in steps),
+        "steps": steps,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nvs {previous_path} ({previous.get('commit')})")
+    for name, result in current["flows"].items():
+        old = previous.get("flows", {}).get(name)
+        if not old:
+            continue
+        for phase in ("cold", "warm"):
+            now, before = result[phase], old[phase]
+            change = (now["seconds"] - before["seconds"]) / before["seconds"] * 100 if before["seconds"] else 0
+            print(f"  {name:<18} {phase:<4} {before['seconds']:>8.3f}s -> {now['seconds']:>8.3f}s ({change:+.1f}%)"
+                  f"  queries {before['queries']} -> {now['queries']}  bytes {before['bytes']} -> {now['bytes']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="bench.db")
+    parser.add_argument("--blobs", default="bench_blobs")
+    parser.add_argument("--out", default="bench.json")
+    parser.add_argument("--flows", nargs="*", choices=list(FLOWS), default=list(FLOWS))
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--compare", help="previous results file to diff against")
+    args = parser.parse_args()
+    if not os.path.exists(args.db):
+        sys.exit(f"{args.db} not found, run python -m benchmarks.seed first")
+
+    results = {"commit": git_commit(), "created_at": datetime.now().isoformat(), "db": args.db, "flows": {}}
+    for name in args.flows:
+        clear_caches()
+        cold = run_flow(args, FLOWS[name])
+        warm = run_flow(args, FLOWS[name])
+        results["flows"][name] = {"cold": cold, "warm": warm}
+        print(f"{name:<18} cold {cold['seconds']:>8.3f}s {cold['queries']:>5} queries {cold['bytes']:>10} bytes"
+              f" | warm {warm['seconds']:>8.3f}s {warm['queries']:>5} queries {warm['bytes']:>10} bytes")
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {args.out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Seed a local SQLite database and blob store with a synthetic dataset.
+
+    python -m benchmarks.seed --db bench.db --blobs bench_blobs \
+        --users 200 --tasks 20000 --followups 500000 --files 5000
+"""
+import argparse
+import os
+import random
+from datetime import date, datetime, timedelta, timezone
+
+from blobstore import LocalBlobStore
+from storage import SQLiteBackend
+
+PRIORITIES = ["Low", "Medium", "High"]
+DEPARTMENTS = ["Security Operations", "Administration", "Technical", "HR", "Finance", "Other"]
+FILE_TYPES = [("pdf", "application/pdf"), ("jpg", "image/jpeg"), ("png", "image/png"),
+              ("docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document")]
+# (share of files, size in bytes)
+FILE_SIZES = [(0.70, 8 * 1024), (0.25, 128 * 1024), (0.05, 1024 * 1024)]
+WORDS = ("patrol gate report camera visitor shift incident access badge checkpoint "
+         "alarm perimeter handover guard inspection maintenance log parking lobby").split()
+
+BOSS = {"username": "boss", "password": "boss-pass", "full_name": "Bench Boss"}
+STAFF_PASSWORD = "staff-pass"
+
+
+def _timestamp(value):
+    # Same text form as SQLite's current_timestamp
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def _batches(rows, size=5000):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _insert_many(conn, table, columns, rows):
+    marks = ", ".join("?" * len(columns))
+    sql = f'insert into "{table}" ({", ".join(columns)}) values ({marks})'
+    for batch in _batches(rows):
+        conn.executemany(sql, batch)
+
+
+def seed(db_path, blob_root, users=200, tasks=20000, followups=500000, files=5000,
+         file_scale=1.0, seed_value=42):
+    rng = random.Random(seed_value)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    backend = SQLiteBackend(db_path)
+    blob_store = LocalBlobStore(blob_root)
+    conn = backend.conn
+    today = date.today()
+    # current_timestamp is UTC; nothing seeded may look newer than real writes
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    with conn:
+        user_rows = [("Bench Boss", BOSS["username"], BOSS["password"], "boss", "active", "", "", "Administration",
+                      datetime.now().isoformat())]
+        for i in range(users):
+            status = "pending" if i % 20 == 0 else "active"
+            user_rows.append((f"Guard {i:04d}", f"guard{i:04d}", STAFF_PASSWORD, "staff", status,
+                              f"guard{i:04d}@example.com", "", rng.choice(DEPARTMENTS), datetime.now().isoformat()))
+        _insert_many(conn, "UsersTable",
+                     ["full_name", "username", "password", "role", "status", "email", "phone", "department", "requested_at"],
+                     user_rows)
+        staff = [(i, r[0]) for i, r in enumerate(user_rows, start=1) if r[3] == "staff" and r[4] == "active"]
+        staff_names = [name for _, name in staff]
+
+        task_rows = []
+        for i in range(tasks):
+            deadline = today + timedelta(days=rng.randint(-365, 60))
+            status = "Finished" if deadline < today and rng.random() < 0.8 else "Pending"
+            assignee_id, assignee = rng.choice(staff)
+            created = min(datetime.combine(deadline, datetime.min.time()) - timedelta(hours=rng.randint(24, 24 * 30)),
+                          now - timedelta(hours=1))
+            completed = None
+            if status == "Finished":
+                completed = min(created + timedelta(hours=rng.randint(1, 24 * 40)), now)
+            task_rows.append((f"{_sentence(rng, 3).capitalize()} #{i}", deadline.isoformat(),
+                              rng.choice(PRIORITIES), status, assignee, assignee_id,
+                              _timestamp(created), _timestamp(completed) if completed else None,
+                              _timestamp(completed or created)))
+        _insert_many(conn, "TasksTable", ["title", "deadline", "priority", "status", "assigned_to", "assigned_to_id",
+                                          "created_at", "completed_at", "updated_at"], task_rows)
+
+        followup_rows = [(rng.randint(1, tasks), rng.choice(staff_names), _sentence(rng, rng.randint(5, 30)))
+                         for _ in range(followups)]
+        followup_rows.sort(key=lambda r: r[0])
+        _insert_many(conn, "FollowupsTable", ["task_id", "author_name", "content"], followup_rows)
+
+    file_rows, blob_rows = [], []
+    for i in range(files):
+        pick, size = rng.random(), FILE_SIZES[-1][1]
+        for share, candidate in FILE_SIZES:
+            if pick < share:
+                size = candidate
+                break
+            pick -= share
+        size = max(1, int(size * file_scale))
+        extension, mime = rng.choice(FILE_TYPES)
+        content_hash, stored, stored_size = blob_store.put(rng.randbytes(size))
+        file_rows.append((rng.randint(1, tasks), f"attachment_{i}.{extension}", mime, stored, content_hash,
+                          rng.choice(staff_names), datetime.now().isoformat()))
+        blob_rows.append((content_hash, stored, stored_size))
+    with conn:
+        # Reference counts come from the TaskFilesTable triggers
+        _insert_many(conn, "BlobsTable", ["hash", "size", "stored_size"], blob_rows)
+        _insert_many(conn, "TaskFilesTable",
+                     ["task_id", "file_name", "file_type", "file_size", "content_hash", "uploaded_by", "uploaded_at"],
+                     file_rows)
+    conn.execute("analyze")
+    return backend
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="bench.db")
+    parser.add_argument("--blobs", default="bench_blobs")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--followups", type=int, default=500000)
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--file-scale", type=float, default=1.0, help="multiplier for attachment sizes")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    seed(args.db, args.blobs, args.users, args.tasks, args.followups, args.files, args.file_scale, args.seed)
+    print(f"Seeded {args.db}: {args.users} users, {args.tasks} tasks, {args.followups} follow-ups, {args.files} files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import hashlib
+import io
+import os
+import tempfile
+import zlib
+
+# ==========================================
+# CONTENT-ADDRESSED BLOB STORAGE
+# ==========================================
+# Attachment bytes live here, keyed by the sha256 of their original content.
+# TaskFilesTable only keeps metadata plus the content hash, so listing a
+# task's files never touches the payloads. Identical uploads map to the same
+# blob; BlobsTable counts the rows that reference each one (see sql/009).
+#
+# Compressible content is stored zlib-compressed under "<hash>.z" when that
+# saves at least MIN_SAVING of its size. open() always returns the original
+# bytes.
+CHUNK_SIZE = 1024 * 1024
+COMPRESSED_SUFFIX = ".z"
+COMPRESS_LEVEL = 6
+MIN_SAVING = 0.1
+
+
+def _blob_path(content_hash):
+    return os.path.join(content_hash[:2], content_hash[2:4], content_hash)
+
+
+def _copy(fileobj, out, compressed_out, chunk_size):
+    # Hash and write the original, and its compressed form if requested;
+    # returns (sha256, size, compressed size)
+    digest = hashlib.sha256()
+    compressor = zlib.compressobj(COMPRESS_LEVEL) if compressed_out is not None else None
+    size = compressed_size = 0
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+        size += len(chunk)
+        out.write(chunk)
+        if compressor:
+            packed = compressor.compress(chunk)
+            compressed_out.write(packed)
+            compressed_size += len(packed)
+    if compressor:
+        packed = compressor.flush()
+        compressed_out.write(packed)
+        compressed_size += len(packed)
+    return digest.hexdigest(), size, compressed_size
+
+
+def _worth_it(size, compressed_size):
+    return compressed_size <= size * (1 - MIN_SAVING)
+
+
+class LocalBlobStore:
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(os.path.join(root, "tmp"), exist_ok=True)
+
+    def _path(self, content_hash):
+        return os.path.join(self.root, _blob_path(content_hash))
+
+    def _temp(self):
+        fd, path = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        return os.fdopen(fd, "wb"), path
+
+    def put_stream(self, fileobj, chunk_size=CHUNK_SIZE, compress=False):
+        # Returns (content hash, original size, stored size)
+        out, raw_path = self._temp()
+        packed_out, packed_path = self._temp() if compress else (None, None)
+        try:
+            with out:
+                if packed_out:
+                    with packed_out:
+                        content_hash, size, packed_size = _copy(fileobj, out, packed_out, chunk_size)
+                else:
+                    content_hash, size, packed_size = _copy(fileobj, out, None, chunk_size)
+            stored = self._stored_path(content_hash)
+            if stored:
+                return content_hash, size, os.path.getsize(stored)
+            if packed_path and _worth_it(size, packed_size):
+                keep, final_path, stored_size = packed_path, self._path(content_hash) + COMPRESSED_SUFFIX, packed_size
+            else:
+                keep, final_path, stored_size = raw_path, self._path(content_hash), size
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(keep, final_path)
+            return content_hash, size, stored_size
+        finally:
+            for path in (raw_path, packed_path):
+                if path and os.path.exists(path):
+                    os.remove(path)
+
+    def put(self, data, compress=False):
+        return self.put_stream(io.BytesIO(data), compress=compress)
+
+    def _stored_path(self, content_hash):
+        for path in (self._path(content_hash), self._path(content_hash) + COMPRESSED_SUFFIX):
+            if os.path.exists(path):
+                return path
+        return None
+
+    def open(self, content_hash):
+        path = self._stored_path(content_hash)
+        if path is None:
+            raise FileNotFoundError(content_hash)
+        if path.endswith(COMPRESSED_SUFFIX):
+            with open(path, "rb") as f:
+                return io.BytesIO(zlib.decompress(f.read()))
+        return open(path, "rb")
+
+    def exists(self, content_hash):
+        return self._stored_path(content_hash) is not None
+
+    def stored_size(self, content_hash):
+        path = self._stored_path(content_hash)
+        return os.path.getsize(path) if path else None
+
+    def delete(self, content_hash):
+        for path in (self._path(content_hash), self._path(content_hash) + COMPRESSED_SUFFIX):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class SupabaseBlobStore:
+    # Object store backend using a Supabase Storage bucket
+    def __init__(self, client, bucket):
+        self.bucket = client.storage.from_(bucket)
+
+    def put_stream(self, fileobj, chunk_size=CHUNK_SIZE, compress=False):
+        with tempfile.SpooledTemporaryFile(max_size=8 * CHUNK_SIZE) as spool, \
+                tempfile.SpooledTemporaryFile(max_size=8 * CHUNK_SIZE) as packed:
+            content_hash, size, packed_size = _copy(fileobj, spool, packed if compress else None, chunk_size)
+            if compress and _worth_it(size, packed_size):
+                source, path, stored_size = packed, _blob_path(content_hash) + COMPRESSED_SUFFIX, packed_size
+            else:
+                source, path, stored_size = spool, _blob_path(content_hash), size
+            source.seek(0)
+            self.bucket.upload(path, source.read(), {"upsert": "true"})
+        return content_hash, size, stored_size
+
+    def put(self, data, compress=False):
+        return self.put_stream(io.BytesIO(data), compress=compress)
+
+    def open(self, content_hash):
+        # Most reads are images and thumbnails, which are stored as is, so
+        # the plain path is tried first
+        try:
+            return io.BytesIO(self.bucket.download(_blob_path(content_hash)))
+        except Exception:
+            try:
+                packed = self.bucket.download(_blob_path(content_hash) + COMPRESSED_SUFFIX)
+            except Exception:
+                raise FileNotFoundError(content_hash)
+            return io.BytesIO(zlib.decompress(packed))
+
+    def _listing(self, content_hash):
+        folder, name = os.path.split(_blob_path(content_hash))
+        return {f.get("name"): f for f in self.bucket.list(folder) if f.get("name", "").startswith(name)}
+
+    def exists(self, content_hash):
+        return bool(self._listing(content_hash))
+
+    def stored_size(self, content_hash):
+        for entry in self._listing(content_hash).values():
+            return (entry.get("metadata") or {}).get("size")
+        return None
+
+    def delete(self, content_hash):
+        path = _blob_path(content_hash)
+        self.bucket.remove([path, path + COMPRESSED_SUFFIX])
+
+
+def make_blob_store(backend="local", root="blobs", client=None, bucket="task-files"):
+    if backend == "supabase":
+        return SupabaseBlobStore(client, bucket)
+    return LocalBlobStore(root)
@@ -0,0 +1,112 @@
+import csv
+import os
+import tempfile
+import time
+import zipfile
+
+import repository
+
+# ==========================================
+# EXPORTS
+# ==========================================
+# Tasks, their followups and attachment metadata are read one batch at a
+# time and appended to files on disk, so memory stays flat however much
+# history is exported. The finished file is returned as a path.
+TASK_COLUMNS = ["id", "title", "status", "priority", "deadline", "assigned_to", "assigned_to_id", "created_at"]
+FOLLOWUP_COLUMNS = ["id", "task_id", "author_name", "content", "created_at"]
+FILE_COLUMNS = ["id", "task_id", "file_name", "file_type", "file_size", "uploaded_by", "uploaded_at"]
+SHEETS = {
+    "tasks": TASK_COLUMNS,
+    "followups": FOLLOWUP_COLUMNS,
+    "attachments": FILE_COLUMNS,
+}
+FORMATS = {"CSV (zip)": "zip", "Excel": "xlsx"}
+FILE_PREFIX = "tasks_export_"
+# Prepared files of sessions that ended without replacing them are removed
+# by the next export once they are this old
+MAX_AGE = 3600
+
+
+def _rows(filters, batch_size):
+    # (sheet, rows) batches: each batch of tasks followed by its followups
+    # and attachment rows
+    for tasks in repository.iter_tasks(", ".join(TASK_COLUMNS), batch_size=batch_size, **filters):
+        yield "tasks", tasks
+        task_ids = [t["id"] for t in tasks]
+        for followups in repository.iter_task_children(
+                "FollowupsTable", ", ".join(FOLLOWUP_COLUMNS), task_ids, batch_size):
+            yield "followups", followups
+        for files in repository.iter_task_children(
+                "TaskFilesTable", ", ".join(FILE_COLUMNS), task_ids, batch_size):
+            yield "attachments", files
+
+
+def _write_zip(path, filters, batch_size):
+    counts = dict.fromkeys(SHEETS, 0)
+    with tempfile.TemporaryDirectory(prefix="export_") as tmp:
+        handles = {name: open(os.path.join(tmp, f"{name}.csv"), "w", newline="", encoding="utf-8-sig")
+                   for name in SHEETS}
+        try:
+            writers = {name: csv.DictWriter(handles[name], SHEETS[name], extrasaction="ignore")
+                       for name in SHEETS}
+            for writer in writers.values():
+                writer.writeheader()
+            for name, rows in _rows(filters, batch_size):
+                writers[name].writerows(rows)
+                counts[name] += len(rows)
+        finally:
+            for handle in handles.values():
+                handle.close()
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name in SHEETS:
+                zf.write(os.path.join(tmp, f"{name}.csv"), f"{name}.csv")
+    return counts
+
+
+def _write_xlsx(path, filters, batch_size):
+    # Write-only workbooks stream each sheet's rows to disk as they arrive
+    from openpyxl import Workbook
+
+    counts = dict.fromkeys(SHEETS, 0)
+    workbook = Workbook(write_only=True)
+    sheets = {name: workbook.create_sheet(name) for name in SHEETS}
+    for name, columns in SHEETS.items():
+        sheets[name].append(columns)
+    for name, rows in _rows(filters, batch_size):
+        columns = SHEETS[name]
+        for row in rows:
+            sheets[name].append([row.get(c) for c in columns])
+        counts[name] += len(rows)
+    workbook.save(path)
+    return counts
+
+
+def remove_stale_exports(max_age=MAX_AGE):
+    cutoff = time.time() - max_age
+    tmp = tempfile.gettempdir()
+    for name in os.listdir(tmp):
+        if not name.startswith(FILE_PREFIX):
+            continue
+        path = os.path.join(tmp, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def export_tasks(fmt="zip", created_from=None, created_to=None, assignee_id=None, status=None,
+                 batch_size=repository.EXPORT_BATCH):
+    # Returns (path, row counts per sheet); the caller deletes the file
+    filters = {"created_from": created_from, "created_to": created_to,
+               "assignee_id": assignee_id, "status": status}
+    remove_stale_exports()
+    fd, path = tempfile.mkstemp(prefix=FILE_PREFIX, suffix=f".{fmt}")
+    os.close(fd)
+    try:
+        writer = _write_xlsx if fmt == "xlsx" else _write_zip
+        counts = writer(path, filters, batch_size)
+    except Exception:
+        os.remove(path)
+        raise
+    return path, counts
@@ -0,0 +1,75 @@
+import pandas as pd
+
+import repository
+
+# ==========================================
+# TASK IMPORT
+# ==========================================
+# A spreadsheet of tasks is checked column by column with pandas; rows that
+# fail any check are returned with their reasons instead of being inserted.
+BATCH_SIZE = 200
+PRIORITIES = ["Low", "Medium", "High"]
+REQUIRED_COLUMNS = ["title", "assigned_to", "priority", "deadline"]
+# Accepted spellings of the column headers
+COLUMN_ALIASES = {"assignee": "assigned_to", "assigned to": "assigned_to", "due": "deadline", "due date": "deadline"}
+
+
+def read_table(file):
+    # Every cell as text so validation sees exactly what was typed
+    if file.name.lower().endswith((".xlsx", ".xls")):
+        df = pd.read_excel(file, dtype=str)
+    else:
+        df = pd.read_csv(file, dtype=str, skipinitialspace=True)
+    df.columns = [COLUMN_ALIASES.get(c.strip().lower(), c.strip().lower()) for c in df.columns]
+    return df
+
+
+def validate(df, active_users):
+    # (records ready to insert, rejected rows with an "errors" column)
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    df = df[REQUIRED_COLUMNS].fillna("").apply(lambda col: col.str.strip())
+    df.index = df.index + 2  # spreadsheet row numbers, after the header
+
+    # Assignees by case-insensitive name; names shared by several active
+    # users are ambiguous and rejected
+    users = pd.DataFrame(active_users, columns=["id", "full_name"])
+    users["key"] = users["full_name"].str.strip().str.lower()
+    counts = users["key"].value_counts()
+    unique = users[users["key"].map(counts) == 1].set_index("key")
+    assignee_key = df["assigned_to"].str.lower()
+    assignee_id = assignee_key.map(unique["id"])
+
+    priority = df["priority"].str.capitalize()
+    # Each cell parsed on its own: sheets often mix date styles
+    deadline = pd.to_datetime(df["deadline"], errors="coerce", format="mixed")
+
+    checks = {
+        "missing title": df["title"] == "",
+        "unknown or inactive assignee": assignee_id.isna() & ~assignee_key.isin(counts[counts > 1].index),
+        "ambiguous assignee name": assignee_key.isin(counts[counts > 1].index),
+        "priority must be Low, Medium or High": ~priority.isin(PRIORITIES),
+        "deadline is not a date": deadline.isna(),
+    }
+    errors = pd.Series("", index=df.index)
+    for reason, failed in checks.items():
+        errors = errors.where(~failed, errors + "; " + reason)
+    errors = errors.str.lstrip("; ")
+
+    ok = errors == ""
+    accepted = pd.DataFrame({
+        "title": df.loc[ok, "title"],
+        "deadline": deadline[ok].dt.strftime("%Y-%m-%d"),
+        "priority": priority[ok],
+        "status": "Pending",
+        "assigned_to": assignee_key[ok].map(unique["full_name"]),
+        "assigned_to_id": assignee_id[ok].astype("int64"),
+    })
+    rejected = df.loc[~ok].assign(errors=errors[~ok])
+    return accepted.to_dict("records"), rejected
+
+
+def import_tasks(records, batch_size=BATCH_SIZE):
+    return repository.create_tasks(records, batch_size=batch_size)
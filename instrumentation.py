@@ -0,0 +1,233 @@
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# ==========================================
+# QUERY INSTRUMENTATION
+# ==========================================
+# InstrumentedBackend wraps a storage backend and times every execute().
+# Calls are attributed to the script run in progress on the current thread
+# (start_run/finish_run) and added to process-wide per-table metrics.
+logger = logging.getLogger("perf")
+
+OPERATIONS = {"select", "insert", "update", "delete", "upsert"}
+MODIFIERS = {"eq", "neq", "gt", "gte", "lt", "lte", "like", "ilike", "in_", "is_", "order", "limit", "range"}
+# Never echo these values into the panel or logs
+REDACTED_COLUMNS = {"password"}
+# Same query shape this many times in one run is flagged as a likely N+1
+REPEAT_THRESHOLD = 3
+
+
+def _payload_bytes(data):
+    try:
+        return len(json.dumps(data, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _describe(method, args, kwargs):
+    if method in ("order", "limit", "range"):
+        values = [repr(a) for a in args] + [f"{k}={v!r}" for k, v in kwargs.items()]
+        return f"{method}({', '.join(values)})"
+    column = args[0] if args else "?"
+    value = "***" if column in REDACTED_COLUMNS else repr(args[1] if len(args) > 1 else None)
+    return f"{method}({column}={value})"
+
+
+class RunRecorder:
+    def __init__(self, label=""):
+        self.label = label
+        self.started = time.perf_counter()
+        self.render_ms = None
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def add(self, call):
+        with self._lock:
+            self.calls.append(call)
+
+    def finish(self):
+        self.render_ms = round((time.perf_counter() - self.started) * 1000, 2)
+
+    def totals(self):
+        return {
+            "queries": len(self.calls),
+            "rows": sum(c["rows"] for c in self.calls),
+            "bytes": sum(c["bytes"] for c in self.calls),
+            "query_ms": round(sum(c["ms"] for c in self.calls), 2),
+            "render_ms": self.render_ms,
+        }
+
+    def repeated(self):
+        # Query shapes (filter columns, not values) issued repeatedly in one run
+        shapes = defaultdict(int)
+        for c in self.calls:
+            shape = (c["table"], c["operation"], tuple(f.split("=")[0] for f in c["filters"]))
+            shapes[shape] += 1
+        return {shape: n for shape, n in shapes.items() if n >= REPEAT_THRESHOLD}
+
+
+class Metrics:
+    # Process-wide totals per (table, operation)
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._data = defaultdict(lambda: {"calls": 0, "errors": 0, "rows": 0, "bytes": 0, "ms": 0.0})
+
+    def add(self, call):
+        with self._lock:
+            entry = self._data[(call["table"], call["operation"])]
+            entry["calls"] += 1
+            entry["errors"] += int(bool(call["error"]))
+            entry["rows"] += call["rows"]
+            entry["bytes"] += call["bytes"]
+            entry["ms"] += call["ms"]
+
+    def snapshot(self):
+        with self._lock:
+            return {f"{table}.{operation}": dict(v) for (table, operation), v in self._data.items()}
+
+    def totals(self):
+        snapshot = self.snapshot().values()
+        return {
+            "queries": sum(v["calls"] for v in snapshot),
+            "bytes": sum(v["bytes"] for v in snapshot),
+            "ms": round(sum(v["ms"] for v in snapshot), 2),
+        }
+
+
+metrics = Metrics()
+_local = threading.local()
+# Called with every finished run's recorder (benchmarks/run.py)
+_run_listeners = []
+# Whether fragment runs are logged too, set by configure_export
+_export_runs = False
+
+
+def add_run_listener(fn):
+    _run_listeners.append(fn)
+
+
+def remove_run_listener(fn):
+    _run_listeners.remove(fn)
+
+
+def start_run(label=""):
+    recorder = RunRecorder(label)
+    _local.recorder = recorder
+    return recorder
+
+
+def current_run():
+    return getattr(_local, "recorder", None)
+
+
+def bind_run(recorder):
+    # Attribute calls made on this thread to a run started elsewhere
+    _local.recorder = recorder
+
+
+def finish_run(export=False):
+    recorder = current_run()
+    if recorder is None:
+        return None
+    recorder.finish()
+    _local.recorder = None
+    for listener in list(_run_listeners):
+        listener(recorder)
+    if export:
+        logger.info(json.dumps({"run": recorder.label, **recorder.totals(), "calls": recorder.calls}, default=str))
+    return recorder
+
+
+@contextmanager
+def fragment_run(label):
+    # A fragment rerun executes without the script run around it, so it is
+    # recorded as a run of its own; inside a full run its calls already go
+    # to that run and this yields None
+    if current_run() is not None:
+        yield None
+        return
+    recorder = start_run(label)
+    try:
+        yield recorder
+    finally:
+        finish_run(export=_export_runs)
+
+
+def configure_export(enabled):
+    # Structured JSON lines, one per script run, on the "perf" logger
+    global _export_runs
+    _export_runs = enabled
+    if enabled and not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+def _record(table, operation, filters, started, result, error):
+    data = getattr(result, "data", None) if result is not None else None
+    call = {
+        "table": table,
+        "operation": operation,
+        "filters": list(filters),
+        "rows": len(data) if isinstance(data, list) else int(data is not None),
+        "bytes": _payload_bytes(data) if data is not None else 0,
+        "ms": round((time.perf_counter() - started) * 1000, 2),
+        "error": error,
+    }
+    metrics.add(call)
+    recorder = current_run()
+    if recorder is not None:
+        recorder.add(call)
+
+
+class InstrumentedQuery:
+    def __init__(self, builder, table, operation="select", filters=()):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+        self._filters = filters
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            operation, filters = self._operation, self._filters
+            if name in OPERATIONS:
+                operation = name
+            elif name in MODIFIERS:
+                filters = filters + (_describe(name, args, kwargs),)
+            return InstrumentedQuery(attr(*args, **kwargs), self._table, operation, filters)
+        return call
+
+    def execute(self):
+        started = time.perf_counter()
+        try:
+            result = self._builder.execute()
+        except Exception as e:
+            _record(self._table, self._operation, self._filters, started, None, type(e).__name__)
+            raise
+        _record(self._table, self._operation, self._filters, started, result, None)
+        return result
+
+
+class InstrumentedBackend:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def table(self, name):
+        return InstrumentedQuery(self.backend.table(name), name)
+
+    def rpc(self, name, params=None):
+        return InstrumentedQuery(self.backend.rpc(name, params), name, "rpc", tuple(sorted(params or {})))
@@ -0,0 +1,180 @@
+"""Attachment storage report and clean-up.
+
+    python -m maintenance                    # space used and saved, hosted database
+    python -m maintenance --sqlite local.db --blob-root blobs
+    python -m maintenance --gc               # delete blobs no file references any more
+    python -m maintenance --fill-sizes       # sizes of blobs stored before sql/009
+    python -m maintenance --migrate-inline   # move base64 file_data into the blob store
+
+Files are stored once per content hash (blobstore.py), compressed when that
+saves space, and counted in BlobsTable by triggers on TaskFilesTable. The
+report compares what users uploaded with what the store holds.
+"""
+import argparse
+import base64
+import os
+from datetime import datetime, timedelta, timezone
+
+import repository
+import uploads
+
+# An unreferenced blob may be one whose file row is being inserted right now
+GC_GRACE = timedelta(hours=1)
+
+
+def _mb(n):
+    return f"{(n or 0) / 1024 / 1024:,.1f} MB"
+
+
+def report(batch_size=repository.EXPORT_BATCH):
+    # Only rows in the blob store count as uploaded; inline rows are listed
+    # separately. Renditions have no file row and are totalled apart.
+    logical, files, inline, originals = 0, 0, 0, set()
+    for rows in repository.iter_rows("TaskFilesTable", "id, file_size, content_hash", batch_size=batch_size):
+        for row in rows:
+            files += 1
+            if row.get("content_hash") is None:
+                inline += 1
+                continue
+            logical += row.get("file_size") or 0
+            originals.add(row["content_hash"])
+    unique, renditions, stored, dedup_saved = 0, 0, 0, 0
+    blobs, unreferenced, unknown = 0, 0, 0
+    for rows in repository.iter_blobs(batch_size):
+        for blob in rows:
+            blobs += 1
+            if blob["ref_count"] <= 0:
+                unreferenced += 1
+                continue
+            if blob["size"] is None or blob["stored_size"] is None:
+                unknown += 1
+            size = blob["size"] or 0
+            if blob["hash"] in originals:
+                unique += size
+                # Every reference after the first is a copy not stored
+                dedup_saved += size * (blob["ref_count"] - 1)
+            else:
+                renditions += size
+            stored += blob["stored_size"] if blob["stored_size"] is not None else size
+    return {
+        "files": files,
+        "inline_files": inline,
+        "blobs": blobs,
+        "unreferenced_blobs": unreferenced,
+        "blobs_without_sizes": unknown,
+        "uploaded_bytes": logical,
+        "unique_bytes": unique,
+        "rendition_bytes": renditions,
+        "stored_bytes": stored,
+        "dedup_saved_bytes": dedup_saved,
+        "compression_saved_bytes": unique + renditions - stored,
+    }
+
+
+def print_report(stats):
+    print(f"{stats['files']:,} files, {stats['blobs']:,} blobs")
+    print(f"  uploaded        {_mb(stats['uploaded_bytes'])}")
+    print(f"  unique          {_mb(stats['unique_bytes'])}   (dedup saved {_mb(stats['dedup_saved_bytes'])})")
+    print(f"  + renditions    {_mb(stats['rendition_bytes'])}")
+    print(f"  stored          {_mb(stats['stored_bytes'])}   (compression saved {_mb(stats['compression_saved_bytes'])})")
+    if stats["unreferenced_blobs"]:
+        print(f"  {stats['unreferenced_blobs']:,} unreferenced blobs, run --gc")
+    if stats["blobs_without_sizes"]:
+        print(f"  {stats['blobs_without_sizes']:,} blobs without sizes, run --fill-sizes")
+    if stats["inline_files"]:
+        print(f"  {stats['inline_files']:,} files still inline in the database, run --migrate-inline")
+
+
+def collect_garbage(blob_store, grace=GC_GRACE):
+    # (blobs deleted, stored bytes freed). The row goes first, and only while
+    # still unreferenced and idle since idle_before; the stored object is
+    # deleted only if that removed the row, so a blob an upload recorded or
+    # referenced meanwhile is kept.
+    idle_before = (datetime.now(timezone.utc) - grace).isoformat()
+    deleted, freed = 0, 0
+    while True:
+        blobs = repository.unreferenced_blobs(idle_before)
+        for blob in blobs:
+            if repository.forget_blob(blob["hash"], idle_before):
+                blob_store.delete(blob["hash"])
+                deleted += 1
+                freed += blob["stored_size"] or blob["size"] or 0
+        if len(blobs) < repository.EXPORT_BATCH:
+            return deleted, freed
+
+
+def fill_sizes(blob_store):
+    filled = 0
+    for rows in repository.iter_blobs():
+        for blob in rows:
+            if blob["ref_count"] <= 0 or (blob["size"] is not None and blob["stored_size"] is not None):
+                continue
+            stored_size = blob_store.stored_size(blob["hash"])
+            if stored_size is None:
+                print(f"  missing from the store: {blob['hash']}")
+                continue
+            size = blob["size"]
+            if size is None:
+                with blob_store.open(blob["hash"]) as f:
+                    size = sum(len(chunk) for chunk in iter(lambda: f.read(uploads.CHUNK_SIZE), b""))
+            repository.update_blob_sizes(blob["hash"], size, stored_size)
+            filled += 1
+    return filled
+
+
+def migrate_inline(blob_store):
+    moved, total = 0, 0
+    for rows in repository.iter_inline_files():
+        for file in rows:
+            data = base64.b64decode(file.get("file_data") or "")
+            content_hash, size, stored_size = blob_store.put(
+                data, compress=uploads.should_compress(file["file_name"], file["file_type"]))
+            repository.record_blobs([{"hash": content_hash, "size": size, "stored_size": stored_size}])
+            repository.move_file_to_blob(file, content_hash)
+            moved += 1
+            total += size
+    return moved, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sqlite", help="local database file instead of the hosted one")
+    parser.add_argument("--secrets", default=os.path.join(".streamlit", "secrets.toml"))
+    parser.add_argument("--blob-root", help="local blob directory (defaults to BLOB_ROOT or blobs)")
+    parser.add_argument("--gc", action="store_true")
+    parser.add_argument("--fill-sizes", action="store_true")
+    parser.add_argument("--migrate-inline", action="store_true")
+    args = parser.parse_args()
+
+    from blobstore import make_blob_store
+    from scheduler import _secrets
+    from storage import make_backend
+    secrets = _secrets(args.secrets) if os.path.exists(args.secrets) else {}
+    client = None
+    if args.sqlite:
+        repository.set_client(make_backend("sqlite", path=args.sqlite))
+    else:
+        from resources import build_client
+        client = build_client(secrets["URL"], secrets["KEY"])
+        repository.set_client(make_backend("supabase", client=client))
+    blob_backend = "local" if args.blob_root else secrets.get("BLOB_BACKEND", "local")
+    blob_store = make_blob_store(
+        blob_backend,
+        root=args.blob_root or secrets.get("BLOB_ROOT", "blobs"),
+        client=client if blob_backend == "supabase" else None,
+        bucket=secrets.get("BLOB_BUCKET", "task-files"),
+    )
+
+    if args.migrate_inline:
+        moved, total = migrate_inline(blob_store)
+        print(f"Moved {moved:,} inline files ({_mb(total)}) to the blob store")
+    if args.fill_sizes:
+        print(f"Filled in sizes of {fill_sizes(blob_store):,} blobs")
+    if args.gc:
+        deleted, freed = collect_garbage(blob_store)
+        print(f"Deleted {deleted:,} unreferenced blobs, freed {_mb(freed)}")
+    print_report(report())
+
+
+if __name__ == "__main__":
+    main()
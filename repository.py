@@ -0,0 +1,1028 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import instrumentation
+from search import SearchIndex
+
+# ==========================================
+# QUERY CACHE
+# ==========================================
+# Streamlit re-runs app.py on every click, but imported modules live for the
+# whole server process, so these caches are shared by every session.
+TASKS_TTL = 30
+USERS_TTL = 120
+DETAIL_TTL = 30
+
+
+class SingleFlight:
+    # Concurrent loads of the same key run once; the other callers wait for
+    # that result instead of sending the same query again
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, loader):
+        with self._lock:
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            value = loader()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._pending[key]
+
+
+class QueryCache:
+    def __init__(self, maxsize=256, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        # Bumped by every write to a key, whether or not it is cached, so
+        # copies held elsewhere (DetailPrefetcher) can tell they are stale
+        self._versions = defaultdict(int)
+        self._epoch = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def add(self, key, value):
+        # set() unless a live entry is already there
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                return False
+        self.set(key, value)
+        return True
+
+    def version(self, key):
+        with self._lock:
+            return self._epoch, self._versions.get(key, 0)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+                self._versions[key] += 1
+
+    def update(self, key, fn):
+        # Apply fn to a live entry in place, keeping its expiry
+        with self._lock:
+            self._versions[key] += 1
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return False
+            self._data[key] = (entry[0], fn(entry[1]))
+            return True
+
+    def invalidate_matching(self, predicate):
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+                self._versions[key] += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._versions.clear()
+            self._epoch += 1
+
+    def get_or_load(self, key, loader):
+        hit, value = self.get(key)
+        if hit:
+            return value
+
+        def load():
+            value = loader()
+            self.set(key, value)
+            return value
+        return self._flight.do(key, load)
+
+
+class ByteLRUCache:
+    # LRU bounded by the total size of the cached values, not their count
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.total_bytes -= len(old)
+            self._data[key] = value
+            self.total_bytes += len(value)
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.total_bytes -= len(evicted)
+
+    def invalidate(self, key):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.total_bytes -= len(old)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.total_bytes = 0
+
+
+tasks_cache = QueryCache(maxsize=256, ttl=TASKS_TTL)
+users_cache = QueryCache(maxsize=16, ttl=USERS_TTL)
+detail_cache = QueryCache(maxsize=512, ttl=DETAIL_TTL)
+# Longer TTL: counters are kept current by the write paths below, the TTL
+# only bounds drift from writes made by other server processes
+kpi_cache = QueryCache(maxsize=512, ttl=300)
+# Deadline flags from scheduler.py; a new scan lands at most this late
+alerts_cache = QueryCache(maxsize=4, ttl=60)
+# Fetched activity entries stay cached per task; only newer ids are
+# requested again once ACTIVITY_RECHECK seconds have passed
+activity_cache = QueryCache(maxsize=256, ttl=3600)
+download_cache = ByteLRUCache(max_bytes=64 * 1024 * 1024)
+
+# Cache keys
+USERS_DIRECTORY = ("UsersTable", "directory")
+ALERTS_ALL = ("TaskAlertsTable", "all")
+
+
+# Task lists and counters are scoped to everyone (None) or to one assignee's
+# UsersTable id
+def task_key(task_id):
+    return ("TasksTable", "id", task_id)
+
+
+def task_page_key(assignee_id, status, sort_by, page, page_size):
+    return ("TasksTable", "page", assignee_id, status, sort_by, page, page_size)
+
+
+def kpi_key(assignee_id):
+    return ("TasksTable", "kpis", assignee_id)
+
+
+def followups_key(task_id):
+    return ("FollowupsTable", "task_id", task_id)
+
+
+def files_key(task_id):
+    return ("TaskFilesTable", "task_id", task_id)
+
+
+# ==========================================
+# CLIENT
+# ==========================================
+_client = None
+
+
+def set_client(client):
+    global _client
+    _client = client
+
+
+def _table(name):
+    return _client.table(name)
+
+
+# ==========================================
+# TASKS
+# ==========================================
+PAGE_SIZE = 25
+STATUS_FILTERS = {"All Tasks": None, "Pending Only": "Pending", "Completed Only": "Finished"}
+# priority_rank is a generated column (High=1, Medium=2, Low=3), see sql/002
+TASK_SORTS = {
+    "Deadline": [("deadline", False), ("id", False)],
+    "Priority": [("priority_rank", False), ("deadline", False), ("id", False)],
+    "Name": [("assigned_to", False), ("deadline", False), ("id", False)],
+    "Status": [("status", False), ("deadline", False), ("id", False)],
+}
+
+
+def list_tasks(status=None, sort_by="Deadline", page=1, page_size=PAGE_SIZE, assignee_id=None):
+    # One page of tasks plus the total number of matches, filtered, sorted
+    # and sliced by the backend
+    def load():
+        query = _table("TasksTable").select("*", count="exact")
+        if assignee_id is not None:
+            query = query.eq("assigned_to_id", assignee_id)
+        if status:
+            query = query.eq("status", status)
+        for column, desc in TASK_SORTS.get(sort_by, TASK_SORTS["Deadline"]):
+            query = query.order(column, desc=desc)
+        offset = (page - 1) * page_size
+        res = query.range(offset, offset + page_size - 1).execute()
+        return res.data or [], res.count or 0
+    return tasks_cache.get_or_load(task_page_key(assignee_id, status, sort_by, page, page_size), load)
+
+
+def get_task(task_id):
+    def load():
+        res = _table("TasksTable").select("*").eq("id", task_id).execute()
+        return res.data[0] if res.data else None
+    return detail_cache.get_or_load(task_key(task_id), load)
+
+
+def _invalidate_task_lists(*assignee_ids):
+    scopes = {None} | {a for a in assignee_ids if a is not None}
+    tasks_cache.invalidate_matching(lambda k: k[:2] == ("TasksTable", "page") and k[2] in scopes)
+
+
+def create_task(record):
+    result = _table("TasksTable").insert(record).execute()
+    _invalidate_task_lists(record.get("assigned_to_id"))
+    created = result.data[0] if result.data else None
+    if created:
+        _adjust_kpis(None, created)
+        _index_row("task", created)
+    return created
+
+
+def create_tasks(records, batch_size=500):
+    # Bulk insert (task import): one insert per batch and one round of
+    # cache upkeep at the end
+    created = []
+    for start in range(0, len(records), batch_size):
+        result = _table("TasksTable").insert(records[start:start + batch_size]).execute()
+        created.extend(result.data or [])
+    _invalidate_task_lists(*{r.get("assigned_to_id") for r in records})
+    for task in created:
+        _adjust_kpis(None, task)
+        _index_row("task", task)
+    return created
+
+
+def update_task(task, fields):
+    update_tasks([task["id"]], fields)
+
+
+def update_tasks(task_ids, fields):
+    # Same fields on every task in one update (bulk actions on the boss list).
+    # The current rows are read first, not taken from the caller, so the
+    # counter deltas and list invalidation start from what is stored.
+    if not task_ids:
+        return
+    ids = list(task_ids)
+    tasks = _table("TasksTable").select("*").in_("id", ids).execute().data or []
+    _table("TasksTable").update(fields).in_("id", ids).execute()
+    _invalidate_task_lists(*{task.get("assigned_to_id") for task in tasks}, fields.get("assigned_to_id"))
+    detail_cache.invalidate(*(task_key(task_id) for task_id in ids))
+    for task in tasks:
+        _adjust_kpis(task, {**task, **fields})
+        if "title" in fields or "assigned_to_id" in fields:
+            _index_row("task", {**task, **fields})
+
+
+def delete_task(task):
+    return delete_tasks([task["id"]])
+
+
+def delete_tasks(task_ids):
+    # Tasks, their followups and files go in one transaction and one round
+    # trip (see sql/004); the deleted task rows come back for cache upkeep
+    if not task_ids:
+        return []
+    deleted = _client.rpc("delete_tasks", {"p_task_ids": list(task_ids)}).execute().data or []
+    _invalidate_task_lists(*{t.get("assigned_to_id") for t in deleted})
+    for task in deleted:
+        _adjust_kpis(task, None)
+        detail_cache.invalidate(task_key(task["id"]), files_key(task["id"]))
+        activity_cache.invalidate(followups_key(task["id"]))
+        _unindex("task", task["id"])
+    return deleted
+
+
+# ==========================================
+# KPI COUNTERS
+# ==========================================
+KPI_FIELDS = ("active", "completed", "high_priority", "total")
+
+
+def _kpi_contribution(task):
+    if not task:
+        return (0, 0, 0, 0)
+    return (
+        int(task.get("status") == "Pending"),
+        int(task.get("status") == "Finished"),
+        int(task.get("priority") == "High"),
+        1,
+    )
+
+
+def get_task_kpis(assignee_id=None):
+    # All four header counts in one aggregate query (see sql/003, sql/005)
+    def load():
+        res = _client.rpc("task_kpis", {"p_assignee_id": assignee_id}).execute()
+        row = res.data[0] if res.data else {}
+        return {field: int(row.get(field) or 0) for field in KPI_FIELDS}
+    return kpi_cache.get_or_load(kpi_key(assignee_id), load)
+
+
+def _adjust_kpis(old_task, new_task):
+    # Keep cached counters current instead of re-aggregating after each write
+    old = _kpi_contribution(old_task)
+    new = _kpi_contribution(new_task)
+    for task, sign in ((old_task, -1), (new_task, 1)):
+        if not task:
+            continue
+        delta = old if sign < 0 else new
+        for key in {kpi_key(None), kpi_key(task.get("assigned_to_id"))}:
+            kpi_cache.update(key, lambda counts: {
+                field: counts[field] + sign * d for field, d in zip(KPI_FIELDS, delta)
+            })
+
+
+# ==========================================
+# FOLLOWUPS
+# ==========================================
+ACTIVITY_PAGE_SIZE = 20
+ACTIVITY_RECHECK = DETAIL_TTL
+
+
+def _followups_query(task_id):
+    return _table("FollowupsTable").select("*").eq("task_id", task_id).order("id", desc=True)
+
+
+_activity_flight = SingleFlight()
+
+
+def get_activity(task_id, limit=ACTIVITY_PAGE_SIZE):
+    # Newest-first entries for a task plus whether older ones exist. The
+    # first call fetches one page; later calls only ask for ids above the
+    # newest one already held.
+    hit, state = activity_cache.get(followups_key(task_id))
+    if hit and time.monotonic() - state["checked_at"] <= ACTIVITY_RECHECK:
+        return state["entries"], state["has_older"]
+    return _activity_flight.do((followups_key(task_id), limit), lambda: _load_activity(task_id, limit))
+
+
+def _load_activity(task_id, limit):
+    # fetched_id is the newest id read from the backend. Entries this
+    # process added itself are prepended without moving it, so rows other
+    # processes inserted just before them are still picked up.
+    hit, state = activity_cache.get(followups_key(task_id))
+    if not hit:
+        rows = _followups_query(task_id).limit(limit).execute().data or []
+        state = {"entries": rows, "has_older": len(rows) == limit, "checked_at": time.monotonic(),
+                 "fetched_id": rows[0]["id"] if rows else 0}
+    elif time.monotonic() - state["checked_at"] > ACTIVITY_RECHECK:
+        newer = _followups_query(task_id).gt("id", state["fetched_id"]).execute().data or []
+        known = {e["id"] for e in state["entries"]}
+        entries = state["entries"]
+        if any(row["id"] not in known for row in newer):
+            merged = {e["id"]: e for e in entries}
+            merged.update((row["id"], row) for row in newer)
+            entries = sorted(merged.values(), key=lambda e: e["id"], reverse=True)
+        state = {**state, "entries": entries, "checked_at": time.monotonic(),
+                 "fetched_id": newer[0]["id"] if newer else state["fetched_id"]}
+    else:
+        return state["entries"], state["has_older"]
+    activity_cache.set(followups_key(task_id), state)
+    return state["entries"], state["has_older"]
+
+
+def load_older_activity(task_id, limit=ACTIVITY_PAGE_SIZE):
+    # Next page below the oldest cached id
+    entries, has_older = get_activity(task_id, limit)
+    if not has_older or not entries:
+        return
+    older = _followups_query(task_id).lt("id", entries[-1]["id"]).limit(limit).execute().data or []
+    activity_cache.update(followups_key(task_id), lambda state: {
+        **state, "entries": state["entries"] + older, "has_older": len(older) == limit
+    })
+
+
+def add_followups(records):
+    # Several entries in one insert (scheduler reminders)
+    if not records:
+        return []
+    result = _table("FollowupsTable").insert(records).execute()
+    activity_cache.invalidate(*{followups_key(r["task_id"]) for r in records})
+    for row in result.data or []:
+        _index_row("followup", row)
+    return result.data or []
+
+
+def add_followup(task_id, author_name, content):
+    result = _table("FollowupsTable").insert({
+        "task_id": task_id,
+        "author_name": author_name,
+        "content": content
+    }).execute()
+    # Prepend the new entry rather than refetching the log; the next recheck
+    # still asks for everything above the last id read from the backend
+    if result.data:
+        activity_cache.update(followups_key(task_id), lambda state: {
+            **state, "entries": result.data + state["entries"]
+        })
+        for row in result.data:
+            _index_row("followup", row)
+    else:
+        activity_cache.invalidate(followups_key(task_id))
+
+
+# ==========================================
+# FILES
+# ==========================================
+# Everything the file list needs, never the payload
+FILE_LIST_COLUMNS = ("id, task_id, file_name, file_type, file_size, content_hash, thumb_hash, preview_hash, "
+                     "uploaded_by, uploaded_at")
+
+
+def get_task_files(task_id):
+    try:
+        return detail_cache.get_or_load(
+            files_key(task_id),
+            lambda: _table("TaskFilesTable").select(FILE_LIST_COLUMNS).eq("task_id", task_id).execute().data or [],
+        )
+    except Exception:
+        return []
+
+
+def get_file_data(file_id):
+    # Inline base64 payload of rows stored before the blob store
+    res = _table("TaskFilesTable").select("file_data").eq("id", file_id).execute()
+    return res.data[0].get("file_data") if res.data else None
+
+
+def insert_files(records):
+    # One bulk insert for a whole upload batch
+    result = _table("TaskFilesTable").insert(records).execute()
+    detail_cache.invalidate(*{files_key(r["task_id"]) for r in records})
+    for row in result.data or []:
+        _index_row("file", row)
+
+
+def delete_file(file):
+    # Only the row goes; the blob's reference count drops with it (sql/009)
+    _table("TaskFilesTable").delete().eq("id", file["id"]).execute()
+    detail_cache.invalidate(files_key(file["task_id"]))
+    download_cache.invalidate(("TaskFilesTable", file["id"]))
+    _unindex("file", file["id"])
+
+
+# ==========================================
+# DEADLINE ALERTS
+# ==========================================
+ALERT_COLUMNS = "id, task_id, level, deadline, assigned_to_id, flagged_at"
+
+
+def load_alerts():
+    # Every alert row, uncached (for the scheduler's diff)
+    return [row for rows in iter_rows("TaskAlertsTable", ALERT_COLUMNS) for row in rows]
+
+
+def get_alerts():
+    # task id -> alert, for badges on the task list and detail panel
+    return alerts_cache.get_or_load(ALERTS_ALL, lambda: {a["task_id"]: a for a in load_alerts()})
+
+
+ALERT_WRITE_BATCH = 200
+
+
+def write_alerts(rows, stale_task_ids):
+    # Replace the alerts of the given tasks and drop those of stale_task_ids,
+    # a batch of ids per query to keep filters short
+    task_ids = [r["task_id"] for r in rows] + list(stale_task_ids)
+    for start in range(0, len(task_ids), ALERT_WRITE_BATCH):
+        _table("TaskAlertsTable").delete().in_("task_id", task_ids[start:start + ALERT_WRITE_BATCH]).execute()
+    for start in range(0, len(rows), ALERT_WRITE_BATCH):
+        _table("TaskAlertsTable").insert(rows[start:start + ALERT_WRITE_BATCH]).execute()
+    alerts_cache.invalidate(ALERTS_ALL)
+
+
+# ==========================================
+# TASK DETAIL
+# ==========================================
+# Opening a task needs its row, activity log, files and the alert flags.
+# They are independent, so they are fetched side by side on a shared pool;
+# the panel's own calls then hit the cache or wait on the load in flight.
+DETAIL_WORKERS = 8
+_detail_pool = ThreadPoolExecutor(max_workers=DETAIL_WORKERS, thread_name_prefix="detail")
+
+
+def _in_run(run, fn, *args):
+    # Queries made on the worker count towards the script run that asked
+    instrumentation.bind_run(run)
+    try:
+        return fn(*args)
+    finally:
+        instrumentation.bind_run(None)
+
+
+def submit(fn, *args):
+    return _detail_pool.submit(_in_run, instrumentation.current_run(), fn, *args)
+
+
+def fetch_task_detail(task_id, prefetcher=None):
+    # {"task", "activity", "files", "alerts"} -> futures
+    if prefetcher is not None:
+        prefetcher.restore(task_id)
+    return {
+        "task": submit(get_task, task_id),
+        "activity": submit(get_activity, task_id),
+        "files": submit(get_task_files, task_id),
+        "alerts": submit(get_alerts),
+    }
+
+
+# ==========================================
+# PREFETCH
+# ==========================================
+# After a task list renders, the detail of the tasks the user is likely to
+# open next (neighbours of the selected one, then the top of the list) is
+# loaded in the background and kept per session, within a byte budget. The
+# shared caches expire after DETAIL_TTL and are shared by every session;
+# these copies outlive that and are put back when the task is opened.
+PREFETCH_NEIGHBOURS = 2
+PREFETCH_TOP = 5
+PREFETCH_BUDGET = 2 * 1024 * 1024
+PREFETCH_TTL = 120
+# Prefetches run on their own few workers, never on _detail_pool, so
+# opening a task never queues behind them; when all of them are busy
+# further prefetches are dropped rather than queued
+PREFETCH_WORKERS = 4
+_prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+_prefetch_slots = threading.BoundedSemaphore(PREFETCH_WORKERS)
+
+
+def _detail_keys(task_id):
+    return [(detail_cache, task_key(task_id)), (activity_cache, followups_key(task_id)),
+            (detail_cache, files_key(task_id))]
+
+
+def _payload_size(value):
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+class DetailPrefetcher:
+    def __init__(self, max_bytes=PREFETCH_BUDGET, ttl=PREFETCH_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.total_bytes = 0
+        self._data = OrderedDict()   # task_id -> (expires_at, [(cache, key, version, value)], size)
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def _live(self, task_id):
+        # The entry if it has not expired and none of its keys were written
+        entry = self._data.get(task_id)
+        if entry is None:
+            return None
+        expires_at, items, size = entry
+        if expires_at < time.monotonic() or any(cache.version(key) != version for cache, key, version, _ in items):
+            del self._data[task_id]
+            self.total_bytes -= size
+            return None
+        self._data.move_to_end(task_id)
+        return entry
+
+    def restore(self, task_id):
+        # Put a prefetched detail back into the shared caches if they lost it
+        with self._lock:
+            entry = self._live(task_id)
+        if entry is None:
+            return False
+        for cache, key, _, value in entry[1]:
+            cache.add(key, value)
+        return True
+
+    def prefetch(self, task_ids):
+        for task_id in task_ids:
+            with self._lock:
+                if task_id in self._pending or self._live(task_id) is not None:
+                    continue
+            if not _prefetch_slots.acquire(blocking=False):
+                return
+            with self._lock:
+                self._pending.add(task_id)
+            _prefetch_pool.submit(self._load, task_id)
+
+    def _load(self, task_id):
+        try:
+            keys = _detail_keys(task_id)
+            # Versions first: a write during the load makes the copy stale
+            versions = [cache.version(key) for cache, key in keys]
+            get_task(task_id)
+            get_activity(task_id)
+            get_task_files(task_id)
+            items = []
+            for (cache, key), version in zip(keys, versions):
+                hit, value = cache.get(key)
+                if not hit:
+                    return
+                items.append((cache, key, version, value))
+            size = _payload_size([value for _, _, _, value in items])
+            if size > self.max_bytes:
+                return
+            with self._lock:
+                old = self._data.pop(task_id, None)
+                if old is not None:
+                    self.total_bytes -= old[2]
+                self._data[task_id] = (time.monotonic() + self.ttl, items, size)
+                self.total_bytes += size
+                while self.total_bytes > self.max_bytes:
+                    _, evicted = self._data.popitem(last=False)
+                    self.total_bytes -= evicted[2]
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._pending.discard(task_id)
+            _prefetch_slots.release()
+
+
+def prefetch_candidates(task_ids, selected_id=None, neighbours=PREFETCH_NEIGHBOURS, top=PREFETCH_TOP):
+    # Neighbours of the selected task in list order, nearest first, then
+    # the top of the list
+    ordered = []
+    if selected_id in task_ids:
+        i = task_ids.index(selected_id)
+        for step in range(1, neighbours + 1):
+            ordered.extend(task_ids[j] for j in (i + step, i - step) if 0 <= j < len(task_ids))
+    ordered.extend(task_ids[:top])
+    return [t for t in dict.fromkeys(ordered) if t != selected_id]
+
+
+# ==========================================
+# BULK READS
+# ==========================================
+# Exports walk whole tables in id order, one batch per query, without
+# touching the caches above
+EXPORT_BATCH = 500
+
+
+def iter_tasks(columns="*", created_from=None, created_to=None, assignee_id=None, status=None,
+               due_before=None, batch_size=EXPORT_BATCH):
+    # Batches of tasks; created_to and due_before are exclusive
+    last_id = 0
+    while True:
+        query = _table("TasksTable").select(columns).gt("id", last_id)
+        if created_from:
+            query = query.gte("created_at", created_from)
+        if created_to:
+            query = query.lt("created_at", created_to)
+        if due_before:
+            query = query.lt("deadline", due_before)
+        if assignee_id is not None:
+            query = query.eq("assigned_to_id", assignee_id)
+        if status:
+            query = query.eq("status", status)
+        rows = query.order("id").limit(batch_size).execute().data or []
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+def iter_task_children(table, columns, task_ids, batch_size=EXPORT_BATCH):
+    # Batches of FollowupsTable or TaskFilesTable rows for a set of tasks
+    last_id = 0
+    while task_ids:
+        rows = (_table(table).select(columns).in_("task_id", list(task_ids)).gt("id", last_id)
+                .order("id").limit(batch_size).execute().data or [])
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+def iter_rows(table, columns, after_id=0, changed_since=None, batch_size=EXPORT_BATCH):
+    # Batches of rows above an id, optionally only those whose updated_at is
+    # at or after changed_since (TasksTable, see sql/006)
+    while True:
+        query = _table(table).select(columns).gt("id", after_id)
+        if changed_since is not None:
+            query = query.gte("updated_at", changed_since)
+        rows = query.order("id").limit(batch_size).execute().data or []
+        # A short page is not the end: the server may cap rows per response
+        # (1000 on PostgREST) below batch_size, so only an empty one is
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1]["id"]
+
+
+# ==========================================
+# BLOBS
+# ==========================================
+# Reference counts are kept by triggers on TaskFilesTable; the app only
+# records sizes when it stores a blob, and maintenance.py reads the rest.
+BLOB_COLUMNS = "hash, size, stored_size, ref_count, updated_at"
+
+
+def record_blobs(blobs):
+    # [{"hash", "size", "stored_size"}] for blobs just written to the store.
+    # Touching updated_at makes forget_blob refuse them, even when a garbage
+    # collection already picked them as candidates.
+    if not blobs:
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    rows = {b["hash"]: {**b, "updated_at": now} for b in blobs}
+    _table("BlobsTable").upsert(list(rows.values()), on_conflict="hash").execute()
+
+
+def iter_blobs(batch_size=EXPORT_BATCH):
+    last_hash = ""
+    while True:
+        rows = (_table("BlobsTable").select(BLOB_COLUMNS).gt("hash", last_hash)
+                .order("hash").limit(batch_size).execute().data or [])
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            return
+        last_hash = rows[-1]["hash"]
+
+
+def unreferenced_blobs(idle_before, batch_size=EXPORT_BATCH):
+    # Blobs without references whose count has not moved since idle_before
+    return (_table("BlobsTable").select(BLOB_COLUMNS).lte("ref_count", 0).lt("updated_at", idle_before)
+            .order("hash").limit(batch_size).execute().data or [])
+
+
+def forget_blob(content_hash, idle_before):
+    # Removes the row only if the blob is still unreferenced and nothing
+    # recorded or referenced it since idle_before; True if it did
+    res = (_table("BlobsTable").delete().eq("hash", content_hash).lte("ref_count", 0)
+           .lt("updated_at", idle_before).execute())
+    return bool(res.data)
+
+
+def update_blob_sizes(content_hash, size, stored_size):
+    _table("BlobsTable").update({"size": size, "stored_size": stored_size}).eq("hash", content_hash).execute()
+
+
+def iter_inline_files(batch_size=50):
+    # Legacy rows whose payload is still base64 in file_data
+    last_id = 0
+    while True:
+        rows = (_table("TaskFilesTable").select("id, task_id, file_name, file_type, file_data")
+                .is_("content_hash", "null").gt("id", last_id).order("id").limit(batch_size).execute().data or [])
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+def move_file_to_blob(file, content_hash):
+    _table("TaskFilesTable").update({"content_hash": content_hash, "file_data": None}).eq("id", file["id"]).execute()
+    detail_cache.invalidate(files_key(file["task_id"]))
+    download_cache.invalidate(("TaskFilesTable", file["id"]))
+
+
+# ==========================================
+# SEARCH
+# ==========================================
+# The index is built by paging through the three tables by id, then kept
+# current by the write paths above. Rows inserted by other server processes
+# are picked up by id every SEARCH_RECHECK seconds; their edits and deletes
+# only show after the next full rebuild. Rebuilds run on a background
+# thread while searches keep using the current index; only the first search
+# of the process waits for one.
+SEARCH_BATCH = 1000
+SEARCH_RECHECK = 30
+SEARCH_REBUILD = 900
+SEARCH_SOURCES = {
+    "task": ("TasksTable", "id, title, assigned_to_id"),
+    "followup": ("FollowupsTable", "id, task_id, content"),
+    "file": ("TaskFilesTable", "id, task_id, file_name"),
+}
+SEARCH_LIMIT = 20
+
+# Guards swapping _search, rechecks and starting a rebuild
+_search_lock = threading.Lock()
+# owners maps task id -> assigned_to_id so staff only see their own tasks;
+# it is written from every session's thread
+_owners_lock = threading.Lock()
+
+
+def _new_search_state(now=None):
+    return {"index": SearchIndex(), "owners": {}, "watermarks": {}, "built_at": now, "checked_at": now or 0}
+
+
+_search = _new_search_state()
+# The index being rebuilt, if any; writes go to it as well as to _search
+_search_build = None
+# Set once the first index has been built
+_search_ready = threading.Event()
+
+
+def _search_states(state=None):
+    if state is not None:
+        return [state]
+    building = _search_build
+    return [_search] if building is None else [_search, building]
+
+
+def _index_row(kind, row, state=None):
+    for state in _search_states(state):
+        if kind == "task":
+            with _owners_lock:
+                state["owners"][row["id"]] = row.get("assigned_to_id")
+            state["index"].add("task", row["id"], row["id"], row.get("title"))
+        elif kind == "followup":
+            state["index"].add("followup", row["id"], row["task_id"], row.get("content"))
+        else:
+            state["index"].add("file", row["id"], row["task_id"], row.get("file_name"))
+
+
+def _unindex(kind, doc_id):
+    for state in _search_states():
+        if kind == "task":
+            with _owners_lock:
+                state["owners"].pop(doc_id, None)
+            state["index"].remove_task(doc_id)
+        else:
+            state["index"].remove(kind, doc_id)
+
+
+def _index_new_rows(state):
+    for kind, (table, columns) in SEARCH_SOURCES.items():
+        while True:
+            rows = (_table(table).select(columns).gt("id", state["watermarks"].get(kind, 0))
+                    .order("id").limit(SEARCH_BATCH).execute().data or [])
+            for row in rows:
+                _index_row(kind, row, state)
+            if rows:
+                state["watermarks"][kind] = rows[-1]["id"]
+            if len(rows) < SEARCH_BATCH:
+                break
+
+
+def _build_search(state):
+    # Runs on its own thread; the slow full pass holds no lock, the lock is
+    # only taken to catch up on rows added meanwhile and swap
+    global _search, _search_build
+    try:
+        _index_new_rows(state)
+        with _search_lock:
+            _index_new_rows(state)
+            state["checked_at"] = time.monotonic()
+            _search = state
+    except Exception:
+        # Keep the current index; the next search starts another rebuild
+        pass
+    finally:
+        with _search_lock:
+            _search_build = None
+        _search_ready.set()
+
+
+def _refresh_search():
+    global _search_build
+    now = time.monotonic()
+    with _search_lock:
+        if _search_build is None and (_search["built_at"] is None or now - _search["built_at"] > SEARCH_REBUILD):
+            _search_build = _new_search_state(now)
+            threading.Thread(target=_build_search, args=(_search_build,), name="search-build", daemon=True).start()
+        elif _search["built_at"] is not None and now - _search["checked_at"] > SEARCH_RECHECK:
+            _search["checked_at"] = now
+            _index_new_rows(_search)
+    _search_ready.wait()
+
+
+def search(query, assignee_id=None, limit=SEARCH_LIMIT):
+    # Ranked matches across task titles, followups and file names. With an
+    # assignee_id only that user's tasks are returned.
+    _refresh_search()
+    state = _search
+    task_ids = None
+    if assignee_id is not None:
+        with _owners_lock:
+            task_ids = [task_id for task_id, owner in state["owners"].items() if owner == assignee_id]
+    return state["index"].search(query, limit=limit, task_ids=task_ids)
+
+
+# ==========================================
+# USERS
+# ==========================================
+def authenticate(username, password):
+    # Never cached: credentials must always be checked against the table
+    res = _table("UsersTable").select("*").eq("username", username).eq("password", password).execute()
+    return res.data[0] if res.data else None
+
+
+def username_exists(username):
+    res = _table("UsersTable").select("id").eq("username", username).execute()
+    return bool(res.data)
+
+
+def get_user(user_id):
+    res = _table("UsersTable").select("*").eq("id", user_id).execute()
+    return res.data[0] if res.data else None
+
+
+# Everything the picker and user management show; passwords are only read
+# one user at a time through get_user
+DIRECTORY_COLUMNS = "id, full_name, username, role, status, email, phone, department, requested_at"
+# Most matches the assignee picker lists at once
+PICKER_LIMIT = 50
+
+
+class UserDirectory:
+    # One projected snapshot of UsersTable shared by every session. Active
+    # users are kept sorted by lowercased name so prefix search is a bisect.
+    def __init__(self, users):
+        self.users = users
+        self.active = sorted(
+            (u for u in users if u.get("status") == "active" and u.get("full_name")),
+            key=lambda u: u["full_name"].lower(),
+        )
+        self._names = [u["full_name"].lower() for u in self.active]
+
+    def with_status(self, status):
+        return [u for u in self.users if u.get("status") == status]
+
+    def search(self, prefix, limit=None):
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return self.active[:limit]
+        start = bisect_left(self._names, prefix)
+        end = bisect_left(self._names, prefix + "\uffff", start)
+        return self.active[start:end][:limit]
+
+
+def get_user_directory():
+    return users_cache.get_or_load(
+        USERS_DIRECTORY,
+        lambda: UserDirectory(_table("UsersTable").select(DIRECTORY_COLUMNS).order("id").execute().data or []),
+    )
+
+
+def get_all_users():
+    return get_user_directory().users
+
+
+def get_active_users():
+    # id and name of everyone tasks can be assigned to
+    return get_user_directory().active
+
+
+def search_active_users(prefix, limit=None):
+    return get_user_directory().search(prefix, limit)
+
+
+def register_user(record):
+    _table("UsersTable").insert(record).execute()
+    users_cache.invalidate(USERS_DIRECTORY)
+
+
+def set_user_status(user_id, status):
+    # Approval and rejection
+    _table("UsersTable").update({"status": status}).eq("id", user_id).execute()
+    users_cache.invalidate(USERS_DIRECTORY)
+
+
+def set_user_password(user_id, password):
+    _table("UsersTable").update({"password": password}).eq("id", user_id).execute()
+    users_cache.invalidate(USERS_DIRECTORY)
@@ -0,0 +1,96 @@
+import httpx
+import streamlit as st
+from supabase import create_client
+
+import scheduler
+
+try:
+    from supabase import ClientOptions
+except ImportError:
+    from supabase.lib.client_options import ClientOptions
+
+from blobstore import make_blob_store
+from instrumentation import InstrumentedBackend
+from storage import make_backend
+
+# ==========================================
+# SHARED RESOURCES
+# ==========================================
+# One instance per server process, shared by every session and rerun.
+DEFAULT_TIMEOUT = 10
+DEFAULT_STORAGE_TIMEOUT = 60
+DEFAULT_POOL_SIZE = 20
+DEFAULT_KEEPALIVE = 30
+
+
+def build_client(url, key, timeout=DEFAULT_TIMEOUT, storage_timeout=DEFAULT_STORAGE_TIMEOUT,
+                 pool_size=DEFAULT_POOL_SIZE, keepalive=DEFAULT_KEEPALIVE):
+    # Keep-alive connection pool reused by every request of the process
+    http = httpx.Client(
+        timeout=timeout,
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=keepalive,
+        ),
+    )
+    try:
+        options = ClientOptions(
+            postgrest_client_timeout=timeout,
+            storage_client_timeout=storage_timeout,
+            httpx_client=http,
+        )
+    except TypeError:
+        # Older supabase-py without custom httpx clients: its own pooled
+        # session is still reused, only the limits are the library defaults
+        http.close()
+        options = ClientOptions(
+            postgrest_client_timeout=timeout,
+            storage_client_timeout=storage_timeout,
+        )
+    return create_client(url, key, options=options)
+
+
+@st.cache_resource
+def get_client():
+    return build_client(
+        st.secrets["URL"],
+        st.secrets["KEY"],
+        timeout=float(st.secrets.get("DB_TIMEOUT", DEFAULT_TIMEOUT)),
+        storage_timeout=float(st.secrets.get("STORAGE_TIMEOUT", DEFAULT_STORAGE_TIMEOUT)),
+        pool_size=int(st.secrets.get("DB_POOL_SIZE", DEFAULT_POOL_SIZE)),
+        keepalive=float(st.secrets.get("DB_KEEPALIVE", DEFAULT_KEEPALIVE)),
+    )
+
+
+@st.cache_resource
+def get_backend():
+    # STORAGE_BACKEND = "sqlite" runs against a local database file instead
+    # of the hosted service
+    kind = st.secrets.get("STORAGE_BACKEND", "supabase")
+    if kind == "sqlite":
+        backend = make_backend("sqlite", path=st.secrets.get("SQLITE_PATH", "local.db"))
+    else:
+        backend = make_backend("supabase", client=get_client())
+    # Every query is timed and sized for the diagnostics panel and perf log
+    return InstrumentedBackend(backend)
+
+
+@st.cache_resource
+def start_scheduler():
+    # Deadline scan thread; set SCHEDULER = "off" when `python -m scheduler`
+    # runs as its own process instead
+    if st.secrets.get("SCHEDULER", "thread") != "thread":
+        return None
+    return scheduler.start(float(st.secrets.get("SCHEDULER_INTERVAL", scheduler.INTERVAL)))
+
+
+@st.cache_resource
+def get_blob_store():
+    backend = st.secrets.get("BLOB_BACKEND", "local")
+    return make_blob_store(
+        backend,
+        root=st.secrets.get("BLOB_ROOT", "blobs"),
+        client=get_client() if backend == "supabase" else None,
+        bucket=st.secrets.get("BLOB_BUCKET", "task-files"),
+    )
@@ -0,0 +1,141 @@
+"""Deadline scan: flag pending tasks that are due soon or overdue.
+
+Runs inside the app as a background thread (SCHEDULER = "thread", the
+default) or as its own process next to one or more app servers, with
+SCHEDULER = "off" in their secrets:
+
+    python -m scheduler                      # hosted database from .streamlit/secrets.toml
+    python -m scheduler --sqlite local.db    # local database
+    python -m scheduler --once               # one scan, then exit
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import repository
+
+# ==========================================
+# DEADLINE SCAN
+# ==========================================
+# One pass reads pending tasks due before the horizon (status, deadline
+# index), compares them with TaskAlertsTable and writes only the
+# differences. A task that newly becomes due soon or overdue gets one
+# reminder followup.
+logger = logging.getLogger("scheduler")
+
+DUE_SOON_DAYS = 2
+INTERVAL = 300
+REMINDER_AUTHOR = "Reminder"
+REMINDERS = {
+    "due_soon": "⏰ Reminder: this task is due on {deadline}.",
+    "overdue": "⚠️ This task is overdue, it was due on {deadline}.",
+}
+# Reminders are sent when the level rises, never when it stays or drops
+LEVELS = {None: 0, "due_soon": 1, "overdue": 2}
+# Tasks already this many days late are flagged without a reminder, so the
+# first scan of an old database does not post one on every stale task
+REMINDER_MAX_DAYS_LATE = 7
+
+
+def scan(today=None, due_soon_days=DUE_SOON_DAYS):
+    today = today or date.today()
+    horizon = (today + timedelta(days=due_soon_days + 1)).isoformat()
+    remind_after = (today - timedelta(days=REMINDER_MAX_DAYS_LATE)).isoformat()
+    flagged_at = datetime.now(timezone.utc).isoformat()
+
+    wanted = {}
+    for tasks in repository.iter_tasks("id, deadline, assigned_to_id", status="Pending", due_before=horizon):
+        for task in tasks:
+            deadline = str(task.get("deadline") or "")[:10]
+            if not deadline:
+                continue
+            wanted[task["id"]] = {
+                "task_id": task["id"],
+                "level": "overdue" if deadline < today.isoformat() else "due_soon",
+                "deadline": deadline,
+                "assigned_to_id": task.get("assigned_to_id"),
+                "flagged_at": flagged_at,
+            }
+
+    current = {a["task_id"]: a for a in repository.load_alerts()}
+    changed, reminders = [], []
+    for task_id, alert in wanted.items():
+        old = current.get(task_id)
+        if old and old["level"] == alert["level"] and str(old["deadline"])[:10] == alert["deadline"]:
+            continue
+        changed.append(alert)
+        rising = LEVELS[alert["level"]] > LEVELS[old["level"] if old else None]
+        if rising and alert["deadline"] >= remind_after:
+            reminders.append({
+                "task_id": task_id,
+                "author_name": REMINDER_AUTHOR,
+                "content": REMINDERS[alert["level"]].format(deadline=alert["deadline"]),
+            })
+    stale = [task_id for task_id in current if task_id not in wanted]
+
+    repository.write_alerts(changed, stale)
+    repository.add_followups(reminders)
+    return {"flagged": len(wanted), "changed": len(changed), "cleared": len(stale), "reminders": len(reminders)}
+
+
+def run_forever(interval=INTERVAL, stop=None):
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            result = scan()
+            logger.info("deadline scan %s in %.2fs", result, time.perf_counter() - started)
+        except Exception:
+            # A failed scan is retried on the next tick
+            logger.exception("deadline scan failed")
+        stop.wait(interval)
+
+
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def start(interval=INTERVAL):
+    # One daemon thread per process; later calls are no-ops
+    global _thread
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=run_forever, args=(interval,), name="deadline-scheduler", daemon=True)
+            _thread.start()
+    return _thread
+
+
+def _secrets(path):
+    import tomllib
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sqlite", help="local database file instead of the hosted one")
+    parser.add_argument("--secrets", default=os.path.join(".streamlit", "secrets.toml"))
+    parser.add_argument("--interval", type=float, default=INTERVAL)
+    parser.add_argument("--once", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    from storage import make_backend
+    if args.sqlite:
+        repository.set_client(make_backend("sqlite", path=args.sqlite))
+    else:
+        from resources import build_client
+        secrets = _secrets(args.secrets)
+        repository.set_client(make_backend("supabase", client=build_client(secrets["URL"], secrets["KEY"])))
+
+    if args.once:
+        print(scan())
+    else:
+        run_forever(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import heapq
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from operator import itemgetter
+
+# ==========================================
+# SEARCH INDEX
+# ==========================================
+# In-memory inverted index over task titles, followup text and attachment
+# names. Documents are keyed (kind, id) and carry the task they belong to,
+# so a match anywhere leads back to a task. repository.py loads it once per
+# process and keeps it current from its write paths.
+TOKEN = re.compile(r"\w+", re.UNICODE)
+# Matches in a title count more than in a file name or a comment
+KIND_WEIGHTS = {"task": 3.0, "file": 2.0, "followup": 1.0}
+# The last query word also matches longer words starting with it, up to
+# this many of them
+PREFIX_EXPANSIONS = 50
+MIN_PREFIX = 2
+
+
+def tokenize(text):
+    return TOKEN.findall(str(text or "").lower())
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._postings = defaultdict(dict)   # term -> {doc_key: term count * doc weight}
+            self._docs = {}                      # doc_key -> (task_id, text)
+            self._task_docs = defaultdict(set)   # task_id -> doc_keys
+            self._vocabulary = []                # sorted terms, for prefix matches
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, kind, doc_id, task_id, text):
+        key = (kind, doc_id)
+        terms = tokenize(text)
+        with self._lock:
+            self._remove(key)
+            if not terms:
+                return
+            counts = defaultdict(int)
+            for term in terms:
+                counts[term] += 1
+            # Kind weight over sqrt(length), folded into the postings so a
+            # query only multiplies by idf: short titles beat long comments
+            weight = KIND_WEIGHTS.get(kind, 1.0) / math.sqrt(len(terms))
+            for term, n in counts.items():
+                if term not in self._postings:
+                    insort(self._vocabulary, term)
+                self._postings[term][key] = n * weight
+            self._docs[key] = (task_id, str(text))
+            self._task_docs[task_id].add(key)
+
+    def remove(self, kind, doc_id):
+        with self._lock:
+            self._remove((kind, doc_id))
+
+    def remove_task(self, task_id):
+        # A task and everything attached to it
+        with self._lock:
+            for key in list(self._task_docs.get(task_id, ())):
+                self._remove(key)
+
+    def _remove(self, key):
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        task_id, text = doc
+        for term in set(tokenize(text)):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[term]
+                i = bisect_left(self._vocabulary, term)
+                if i < len(self._vocabulary) and self._vocabulary[i] == term:
+                    del self._vocabulary[i]
+        docs = self._task_docs.get(task_id)
+        if docs is not None:
+            docs.discard(key)
+            if not docs:
+                del self._task_docs[task_id]
+
+    def _expand(self, prefix):
+        start = bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start:start + PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def _word_postings(self, word, prefix, total):
+        # (postings, idf) for every indexed term the word matches
+        terms = self._expand(word) if prefix else [word]
+        matches = []
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings:
+                matches.append((postings, math.log(1 + total / (1 + len(postings)))))
+        return matches
+
+    def search(self, query, limit=20, task_ids=None):
+        # Documents containing every query word (the last one also as a
+        # prefix), ranked by tf-idf weighted by kind. task_ids restricts the
+        # search to the documents of those tasks.
+        words = tokenize(query)
+        if not words:
+            return []
+        with self._lock:
+            total = len(self._docs) or 1
+            # The last word only expands once it has MIN_PREFIX characters
+            matched = [
+                self._word_postings(word, i == len(words) - 1 and len(word) >= MIN_PREFIX, total)
+                for i, word in enumerate(words)
+            ]
+            # Rarest word first keeps the candidate set small
+            matched.sort(key=lambda m: sum(len(p) for p, _ in m))
+            scores = None
+            if task_ids is not None:
+                scores = {key: 0.0 for t in task_ids for key in self._task_docs.get(t, ())}
+            for postings_list in matched:
+                if len(postings_list) == 1:
+                    postings, idf = postings_list[0]
+                elif scores is not None and len(scores) < sum(len(p) for p, _ in postings_list):
+                    # Few candidates, many prefix matches: probe the candidates
+                    postings, idf = {}, 1.0
+                    for key in scores:
+                        best = 0
+                        for p, term_idf in postings_list:
+                            if key in p and p[key] * term_idf > best:
+                                best = p[key] * term_idf
+                        if best:
+                            postings[key] = best
+                else:
+                    # Best-scoring prefix match per document
+                    postings, idf = {}, 1.0
+                    for p, term_idf in postings_list:
+                        for key, w in p.items():
+                            if w * term_idf > postings.get(key, 0):
+                                postings[key] = w * term_idf
+                if scores is None:
+                    scores = {key: w * idf for key, w in postings.items()}
+                elif len(postings) < len(scores):
+                    scores = {key: scores[key] + w * idf for key, w in postings.items() if key in scores}
+                else:
+                    scores = {key: sc + postings[key] * idf for key, sc in scores.items() if key in postings}
+                if not scores:
+                    return []
+            docs = self._docs
+            # Only the top matches are turned into result rows
+            hits = []
+            for key, score in heapq.nlargest(limit, scores.items(), key=itemgetter(1)):
+                task_id, text = docs[key]
+                task_doc = docs.get(("task", task_id))
+                hits.append({
+                    "kind": key[0],
+                    "id": key[1],
+                    "task_id": task_id,
+                    "text": text,
+                    "title": task_doc[1] if task_doc else "",
+                    "score": round(score, 4),
+                })
+        return hits
@@ -0,0 +1,7 @@
+-- Attachment bytes move to the blob store (see blobstore.py).
+-- TaskFilesTable keeps metadata plus the sha256 of the content.
+alter table "TaskFilesTable" add column if not exists content_hash text;
+alter table "TaskFilesTable" alter column file_data drop not null;
+
+create index if not exists task_files_task_id_idx on "TaskFilesTable" (task_id);
+create index if not exists task_files_content_hash_idx on "TaskFilesTable" (content_hash);
@@ -0,0 +1,16 @@
+-- Task list filtering, sorting and pagination run in the query
+-- (repository.list_tasks), so the orderings need matching indexes.
+
+-- Sortable priority ordinal: High=1, Medium=2, Low=3 (unknown sorts as Medium)
+alter table "TasksTable" add column if not exists priority_rank smallint
+    generated always as (
+        case priority when 'High' then 1 when 'Medium' then 2 when 'Low' then 3 else 2 end
+    ) stored;
+
+create index if not exists tasks_deadline_idx on "TasksTable" (deadline, id);
+create index if not exists tasks_status_deadline_idx on "TasksTable" (status, deadline, id);
+create index if not exists tasks_priority_deadline_idx on "TasksTable" (priority_rank, deadline, id);
+create index if not exists tasks_status_priority_idx on "TasksTable" (status, priority_rank, deadline, id);
+create index if not exists tasks_assigned_deadline_idx on "TasksTable" (assigned_to, deadline, id);
+
+create index if not exists followups_task_id_idx on "FollowupsTable" (task_id, id desc);
@@ -0,0 +1,15 @@
+-- Header KPI counts (Active, Completed, High Priority, Total) in a single
+-- aggregate pass, globally or for one assignee. Called via
+-- repository.get_task_kpis; cached counters are then kept current by the
+-- repository's write paths.
+create or replace function task_kpis(p_assignee text default null)
+returns table (active bigint, completed bigint, high_priority bigint, total bigint)
+language sql stable as $$
+    select
+        count(*) filter (where status = 'Pending'),
+        count(*) filter (where status = 'Finished'),
+        count(*) filter (where priority = 'High'),
+        count(*)
+    from "TasksTable"
+    where p_assignee is null or assigned_to ilike p_assignee;
+$$;
@@ -0,0 +1,15 @@
+-- Cascade delete for one or many tasks in a single round trip.
+-- The function body runs in one transaction, so a failure leaves no orphans.
+-- Returns the deleted task rows so callers can update their caches.
+create or replace function delete_tasks(p_task_ids bigint[])
+returns setof "TasksTable"
+language plpgsql as $$
+begin
+    delete from "FollowupsTable" where task_id = any(p_task_ids);
+    delete from "TaskFilesTable" where task_id = any(p_task_ids);
+    return query delete from "TasksTable" where id = any(p_task_ids) returning *;
+end;
+$$;
+
+create index if not exists task_files_task_id_idx on "TaskFilesTable" (task_id);
+create index if not exists followups_task_id_idx on "FollowupsTable" (task_id, id desc);
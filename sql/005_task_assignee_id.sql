@@ -0,0 +1,33 @@
+-- Tasks reference their assignee by UsersTable id instead of matching the
+-- free-text assigned_to name with ilike. assigned_to stays as the display
+-- name.
+alter table "TasksTable" add column if not exists assigned_to_id bigint references "UsersTable" (id);
+
+-- Backfill existing rows where the stored name matches exactly one user
+update "TasksTable" t
+set assigned_to_id = u.id
+from "UsersTable" u
+where t.assigned_to_id is null
+  and lower(trim(t.assigned_to)) = lower(trim(u.full_name))
+  and (select count(*) from "UsersTable" d where lower(trim(d.full_name)) = lower(trim(u.full_name))) = 1;
+
+create index if not exists tasks_assignee_id_deadline_idx on "TasksTable" (assigned_to_id, deadline, id);
+create index if not exists tasks_assignee_id_priority_idx on "TasksTable" (assigned_to_id, priority_rank, deadline, id);
+create index if not exists tasks_assignee_id_status_idx on "TasksTable" (assigned_to_id, status, deadline, id);
+
+-- Rows left with a null assigned_to_id had no unique name match; review with:
+--   select id, title, assigned_to from "TasksTable" where assigned_to_id is null;
+
+-- Per-assignee KPI counts now filter on the id
+drop function if exists task_kpis(text);
+create or replace function task_kpis(p_assignee_id bigint default null)
+returns table (active bigint, completed bigint, high_priority bigint, total bigint)
+language sql stable as $$
+    select
+        count(*) filter (where status = 'Pending'),
+        count(*) filter (where status = 'Finished'),
+        count(*) filter (where priority = 'High'),
+        count(*)
+    from "TasksTable"
+    where p_assignee_id is null or assigned_to_id = p_assignee_id;
+$$;
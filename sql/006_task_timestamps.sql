@@ -0,0 +1,28 @@
+-- updated_at moves on every change so readers can fetch only changed rows
+-- (analytics snapshots); completed_at records when a task was finished for
+-- time-to-finish figures
+alter table "TasksTable" add column if not exists updated_at timestamptz default now();
+alter table "TasksTable" add column if not exists completed_at timestamptz;
+
+-- Existing rows: best guess is their creation time; finish times of tasks
+-- completed before this migration are unknown and stay null
+update "TasksTable" set updated_at = coalesce(created_at, now());
+
+create index if not exists tasks_updated_at_idx on "TasksTable" (updated_at, id);
+
+create or replace function tasks_touch() returns trigger
+language plpgsql as $$
+begin
+    new.updated_at := now();
+    if new.status = 'Finished' and old.status is distinct from 'Finished' then
+        new.completed_at := now();
+    elsif new.status is distinct from 'Finished' then
+        new.completed_at := null;
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists tasks_touch on "TasksTable";
+create trigger tasks_touch before update on "TasksTable"
+for each row execute function tasks_touch();
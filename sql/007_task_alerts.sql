@@ -0,0 +1,15 @@
+-- Deadline flags written by scheduler.py, one row per pending task that is
+-- due soon or overdue. The app only reads this table; it never scans
+-- deadlines itself.
+create table if not exists "TaskAlertsTable" (
+    id bigint generated always as identity primary key,
+    task_id bigint not null unique references "TasksTable" (id) on delete cascade,
+    level text not null check (level in ('due_soon', 'overdue')),
+    deadline date,
+    assigned_to_id bigint,
+    flagged_at timestamptz default now()
+);
+
+-- The scan reads pending tasks by deadline through
+-- tasks_status_deadline_idx (sql/002)
+create index if not exists tasks_status_deadline_idx on "TasksTable" (status, deadline, id);
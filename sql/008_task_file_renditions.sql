@@ -0,0 +1,5 @@
+-- Blob store hashes of the thumbnail and mid-size preview made for image
+-- attachments at upload (see thumbnails.py). Null for other files and for
+-- images uploaded before this migration.
+alter table "TaskFilesTable" add column if not exists thumb_hash text;
+alter table "TaskFilesTable" add column if not exists preview_hash text;
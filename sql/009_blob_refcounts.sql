@@ -0,0 +1,63 @@
+-- One row per blob in the blob store with the number of TaskFilesTable
+-- references to it (original, thumbnail and preview hashes). Deleting a
+-- file row, directly or through delete_tasks, only drops its references;
+-- `python -m maintenance --gc` removes blobs nobody references any more.
+create table if not exists "BlobsTable" (
+    hash text primary key,
+    size bigint,                -- original bytes
+    stored_size bigint,         -- bytes in the store, after compression
+    ref_count integer not null default 0,
+    created_at timestamptz default now(),
+    updated_at timestamptz default now()
+);
+
+create index if not exists blobs_ref_count_idx on "BlobsTable" (ref_count, updated_at);
+
+-- Existing references; sizes of renditions are filled in by
+-- `python -m maintenance --fill-sizes`
+insert into "BlobsTable" (hash, size, ref_count)
+select hash, max(size), count(*)
+from (
+    select content_hash as hash, file_size as size from "TaskFilesTable"
+    union all select thumb_hash, null from "TaskFilesTable"
+    union all select preview_hash, null from "TaskFilesTable"
+) refs
+where hash is not null
+group by hash
+on conflict (hash) do update set ref_count = excluded.ref_count, size = coalesce("BlobsTable".size, excluded.size);
+
+create or replace function blob_ref(p_hash text, p_delta integer)
+returns void
+language sql as $$
+    insert into "BlobsTable" (hash, ref_count) values (p_hash, greatest(p_delta, 0))
+    on conflict (hash) do update
+    set ref_count = "BlobsTable".ref_count + p_delta, updated_at = now();
+$$;
+
+create or replace function task_files_blob_refs() returns trigger
+language plpgsql as $$
+declare
+    h text;
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        foreach h in array array[old.content_hash, old.thumb_hash, old.preview_hash] loop
+            if h is not null then
+                perform blob_ref(h, -1);
+            end if;
+        end loop;
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        foreach h in array array[new.content_hash, new.thumb_hash, new.preview_hash] loop
+            if h is not null then
+                perform blob_ref(h, 1);
+            end if;
+        end loop;
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists task_files_blob_refs on "TaskFilesTable";
+create trigger task_files_blob_refs
+after insert or delete or update of content_hash, thumb_hash, preview_hash on "TaskFilesTable"
+for each row execute function task_files_blob_refs();
@@ -0,0 +1,474 @@
+import re
+import sqlite3
+import threading
+
+# ==========================================
+# STORAGE BACKENDS
+# ==========================================
+# repository.py only uses this subset of the Supabase query builder:
+#
+#   backend.table(name)
+#       .select(columns, count=None) / .insert(rows) / .update(fields) / .delete()
+#       .upsert(rows, on_conflict=column)
+#       .eq() .gt() .lt() .in_() .ilike() .order(column, desc=False)
+#       .limit(n) .range(start, end)
+#       .execute()  -> result with .data (list of dicts) and .count
+#   backend.rpc(name, params).execute()
+#
+# SupabaseBackend passes straight through to the hosted service and
+# SQLiteBackend implements the same calls locally, so the app can run and be
+# load-tested without a network.
+
+
+class SupabaseBackend:
+    def __init__(self, client):
+        self.client = client
+
+    def table(self, name):
+        return self.client.table(name)
+
+    def rpc(self, name, params=None):
+        return self.client.rpc(name, params or {})
+
+
+# ==========================================
+# SQLITE
+# ==========================================
+# Mirrors the hosted tables and the indexes from sql/
+SQLITE_SCHEMA = """
+create table if not exists "UsersTable" (
+    id integer primary key autoincrement,
+    full_name text,
+    username text unique,
+    password text,
+    role text default 'staff',
+    status text default 'pending',
+    email text,
+    phone text,
+    department text,
+    requested_at text
+);
+
+create table if not exists "TasksTable" (
+    id integer primary key autoincrement,
+    title text,
+    deadline text,
+    priority text,
+    status text,
+    assigned_to text collate nocase,
+    assigned_to_id integer references "UsersTable" (id),
+    created_at text default current_timestamp,
+    updated_at text default current_timestamp,
+    completed_at text,
+    priority_rank integer generated always as (
+        case priority when 'High' then 1 when 'Medium' then 2 when 'Low' then 3 else 2 end
+    ) stored
+);
+
+create table if not exists "FollowupsTable" (
+    id integer primary key autoincrement,
+    task_id integer,
+    author_name text,
+    content text,
+    created_at text default current_timestamp
+);
+
+create table if not exists "TaskFilesTable" (
+    id integer primary key autoincrement,
+    task_id integer,
+    file_name text,
+    file_type text,
+    file_size integer,
+    file_data text,
+    content_hash text,
+    thumb_hash text,
+    preview_hash text,
+    uploaded_by text,
+    uploaded_at text
+);
+
+create table if not exists "TaskAlertsTable" (
+    id integer primary key autoincrement,
+    task_id integer not null unique references "TasksTable" (id) on delete cascade,
+    level text not null,
+    deadline text,
+    assigned_to_id integer,
+    flagged_at text default current_timestamp
+);
+
+-- sql/009: one row per stored blob, ref_count kept by the triggers below.
+-- Timestamps are ISO like the ones repository.record_blobs writes, so the
+-- garbage collection grace period compares them as text.
+create table if not exists "BlobsTable" (
+    hash text primary key,
+    size integer,
+    stored_size integer,
+    ref_count integer not null default 0,
+    created_at text default (strftime('%Y-%m-%dT%H:%M:%S+00:00', 'now')),
+    updated_at text default (strftime('%Y-%m-%dT%H:%M:%S+00:00', 'now'))
+);
+
+create index if not exists tasks_deadline_idx on "TasksTable" (deadline, id);
+create index if not exists tasks_status_deadline_idx on "TasksTable" (status, deadline, id);
+create index if not exists tasks_priority_deadline_idx on "TasksTable" (priority_rank, deadline, id);
+create index if not exists tasks_status_priority_idx on "TasksTable" (status, priority_rank, deadline, id);
+create index if not exists tasks_assigned_deadline_idx on "TasksTable" (assigned_to, deadline, id);
+create index if not exists tasks_assignee_id_deadline_idx on "TasksTable" (assigned_to_id, deadline, id);
+create index if not exists tasks_assignee_id_priority_idx on "TasksTable" (assigned_to_id, priority_rank, deadline, id);
+create index if not exists tasks_assignee_id_status_idx on "TasksTable" (assigned_to_id, status, deadline, id);
+create index if not exists tasks_updated_at_idx on "TasksTable" (updated_at, id);
+create index if not exists followups_task_id_idx on "FollowupsTable" (task_id, id desc);
+create index if not exists task_files_task_id_idx on "TaskFilesTable" (task_id);
+create index if not exists task_files_content_hash_idx on "TaskFilesTable" (content_hash);
+create index if not exists users_username_idx on "UsersTable" (username);
+create index if not exists users_status_idx on "UsersTable" (status);
+create index if not exists blobs_ref_count_idx on "BlobsTable" (ref_count, updated_at);
+
+create trigger if not exists task_files_blob_refs_insert after insert on "TaskFilesTable"
+begin
+    insert into "BlobsTable" (hash, ref_count)
+    select h, count(*) from (select new.content_hash as h union all select new.thumb_hash union all select new.preview_hash)
+    where h is not null group by h
+    on conflict (hash) do update set ref_count = ref_count + excluded.ref_count,
+        updated_at = strftime('%Y-%m-%dT%H:%M:%S+00:00', 'now');
+end;
+
+create trigger if not exists task_files_blob_refs_delete after delete on "TaskFilesTable"
+begin
+    update "BlobsTable" set
+        ref_count = ref_count - (
+            (hash is old.content_hash) + (hash is old.thumb_hash) + (hash is old.preview_hash)),
+        updated_at = strftime('%Y-%m-%dT%H:%M:%S+00:00', 'now')
+    where hash in (old.content_hash, old.thumb_hash, old.preview_hash);
+end;
+
+create trigger if not exists task_files_blob_refs_update
+after update of content_hash, thumb_hash, preview_hash on "TaskFilesTable"
+begin
+    update "BlobsTable" set
+        ref_count = ref_count - (
+            (hash is old.content_hash) + (hash is old.thumb_hash) + (hash is old.preview_hash)),
+        updated_at = strftime('%Y-%m-%dT%H:%M:%S+00:00', 'now')
+    where hash in (old.content_hash, old.thumb_hash, old.preview_hash);
+    insert into "BlobsTable" (hash, ref_count)
+    select h, count(*) from (select new.content_hash as h union all select new.thumb_hash union all select new.preview_hash)
+    where h is not null group by h
+    on conflict (hash) do update set ref_count = ref_count + excluded.ref_count,
+        updated_at = strftime('%Y-%m-%dT%H:%M:%S+00:00', 'now');
+end;
+
+-- sql/006: updated_at on every change, completed_at when a task is finished
+create trigger if not exists tasks_touch_insert after insert on "TasksTable"
+when new.updated_at is null
+begin
+    update "TasksTable" set updated_at = current_timestamp where id = new.id;
+end;
+
+create trigger if not exists tasks_touch_update after update on "TasksTable"
+begin
+    update "TasksTable" set
+        updated_at = current_timestamp,
+        completed_at = case
+            when new.status = 'Finished' and old.status is not 'Finished' then current_timestamp
+            when new.status = 'Finished' then old.completed_at
+        end
+    where id = new.id;
+end;
+"""
+
+# Columns added after the first release; older local database files get them
+# with alter table before the schema (and its indexes) is applied
+SQLITE_ADDED_COLUMNS = {
+    "TasksTable": {
+        "assigned_to_id": 'integer references "UsersTable" (id)',
+        "updated_at": "text",
+        "completed_at": "text",
+    },
+    "TaskFilesTable": {
+        "thumb_hash": "text",
+        "preview_hash": "text",
+    },
+}
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _ident(name):
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid identifier: {name!r}")
+    return f'"{name}"'
+
+
+class QueryResult:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class SQLiteQuery:
+    def __init__(self, backend, table):
+        self.backend = backend
+        self.table = table
+        self.action = "select"
+        self.columns = "*"
+        self.count = None
+        self.payload = None
+        self.filters = []
+        self.orders = []
+        self.limit_value = None
+        self.offset_value = None
+
+    # Actions
+    def select(self, columns="*", count=None):
+        self.action = "select"
+        self.columns = columns
+        self.count = count
+        return self
+
+    def insert(self, rows):
+        self.action = "insert"
+        self.payload = rows
+        return self
+
+    def update(self, fields):
+        self.action = "update"
+        self.payload = fields
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def upsert(self, rows, on_conflict="id"):
+        self.action = "upsert"
+        self.payload = rows
+        self.conflict = on_conflict
+        return self
+
+    # Filters
+    def _filter(self, column, op, value):
+        self.filters.append((f"{_ident(column)} {op} ?", [value]))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "=", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "!=", value)
+
+    def gt(self, column, value):
+        return self._filter(column, ">", value)
+
+    def gte(self, column, value):
+        return self._filter(column, ">=", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "<", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "<=", value)
+
+    def ilike(self, column, pattern):
+        # SQLite's LIKE is already case-insensitive for ASCII
+        return self._filter(column, "like", pattern)
+
+    def in_(self, column, values):
+        values = list(values)
+        if not values:
+            self.filters.append(("0", []))
+        else:
+            self.filters.append((f"{_ident(column)} in ({', '.join('?' * len(values))})", values))
+        return self
+
+    def is_(self, column, value):
+        if value in (None, "null"):
+            self.filters.append((f"{_ident(column)} is null", []))
+        else:
+            self._filter(column, "is", value)
+        return self
+
+    # Modifiers
+    def order(self, column, desc=False):
+        self.orders.append(f"{_ident(column)} {'desc' if desc else 'asc'}")
+        return self
+
+    def limit(self, n):
+        self.limit_value = n
+        return self
+
+    def range(self, start, end):
+        self.offset_value = start
+        self.limit_value = end - start + 1
+        return self
+
+    # SQL
+    def _where(self):
+        if not self.filters:
+            return "", []
+        clauses, params = zip(*self.filters)
+        return " where " + " and ".join(clauses), [p for ps in params for p in ps]
+
+    def _columns(self):
+        if self.columns.strip() == "*":
+            return "*"
+        return ", ".join(_ident(c.strip()) for c in self.columns.split(","))
+
+    def execute(self):
+        with self.backend.lock:
+            conn = self.backend.conn
+            with conn:
+                return getattr(self, f"_execute_{self.action}")(conn)
+
+    def _execute_select(self, conn):
+        where, params = self._where()
+        sql = f"select {self._columns()} from {_ident(self.table)}{where}"
+        if self.orders:
+            sql += " order by " + ", ".join(self.orders)
+        if self.limit_value is not None:
+            sql += f" limit {int(self.limit_value)}"
+            if self.offset_value:
+                sql += f" offset {int(self.offset_value)}"
+        rows = [dict(r) for r in conn.execute(sql, params)]
+        total = None
+        if self.count:
+            total = conn.execute(f"select count(*) from {_ident(self.table)}{where}", params).fetchone()[0]
+        return QueryResult(rows, total)
+
+    def _execute_insert(self, conn):
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        inserted = []
+        for row in rows:
+            columns = ", ".join(_ident(c) for c in row)
+            marks = ", ".join("?" * len(row))
+            cursor = conn.execute(
+                f"insert into {_ident(self.table)} ({columns}) values ({marks}) returning *",
+                list(row.values()),
+            )
+            inserted.append(dict(cursor.fetchone()))
+        return QueryResult(inserted)
+
+    def _execute_upsert(self, conn):
+        # Insert, or update the given columns of the row with the same key
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        keys = [c.strip() for c in self.conflict.split(",")]
+        upserted = []
+        for row in rows:
+            columns = ", ".join(_ident(c) for c in row)
+            marks = ", ".join("?" * len(row))
+            updates = ", ".join(f"{_ident(c)} = excluded.{_ident(c)}" for c in row if c not in keys)
+            action = f"do update set {updates}" if updates else "do nothing"
+            cursor = conn.execute(
+                f"insert into {_ident(self.table)} ({columns}) values ({marks}) "
+                f"on conflict ({', '.join(_ident(k) for k in keys)}) {action} returning *",
+                list(row.values()),
+            )
+            upserted.extend(dict(r) for r in cursor.fetchall())
+        return QueryResult(upserted)
+
+    def _execute_update(self, conn):
+        where, params = self._where()
+        assignments = ", ".join(f"{_ident(c)} = ?" for c in self.payload)
+        cursor = conn.execute(
+            f"update {_ident(self.table)} set {assignments}{where} returning *",
+            list(self.payload.values()) + params,
+        )
+        return QueryResult([dict(r) for r in cursor.fetchall()])
+
+    def _execute_delete(self, conn):
+        where, params = self._where()
+        cursor = conn.execute(f"delete from {_ident(self.table)}{where} returning *", params)
+        return QueryResult([dict(r) for r in cursor.fetchall()])
+
+
+class SQLiteRpc:
+    def __init__(self, backend, name, params):
+        self.backend = backend
+        self.name = name
+        self.params = params or {}
+
+    def execute(self):
+        handler = getattr(self.backend, f"_rpc_{self.name}", None)
+        if handler is None:
+            raise ValueError(f"Unknown function: {self.name}")
+        with self.backend.lock:
+            conn = self.backend.conn
+            with conn:
+                return QueryResult(handler(conn, **self.params))
+
+
+class SQLiteBackend:
+    def __init__(self, path=":memory:"):
+        self.path = path
+        # One connection guarded by a lock keeps in-memory databases and
+        # Streamlit's per-session threads working the same way
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.RLock()
+        if path != ":memory:":
+            self.conn.execute("pragma journal_mode=wal")
+        self._add_missing_columns()
+        self.conn.executescript(SQLITE_SCHEMA)
+        self._backfill_blobs()
+
+    def _add_missing_columns(self):
+        for table, columns in SQLITE_ADDED_COLUMNS.items():
+            existing = {r["name"] for r in self.conn.execute(f"pragma table_info({_ident(table)})")}
+            if not existing:
+                continue
+            for column, definition in columns.items():
+                if column not in existing:
+                    self.conn.execute(f"alter table {_ident(table)} add column {_ident(column)} {definition}")
+
+    def _backfill_blobs(self):
+        # Files stored before BlobsTable existed have no references counted
+        if self.conn.execute('select 1 from "BlobsTable" limit 1').fetchone():
+            return
+        with self.conn:
+            self.conn.execute("""
+                insert into "BlobsTable" (hash, size, ref_count)
+                select hash, max(size), count(*) from (
+                    select content_hash as hash, file_size as size from "TaskFilesTable"
+                    union all select thumb_hash, null from "TaskFilesTable"
+                    union all select preview_hash, null from "TaskFilesTable"
+                ) where hash is not null group by hash
+            """)
+
+    def table(self, name):
+        return SQLiteQuery(self, name)
+
+    def rpc(self, name, params=None):
+        return SQLiteRpc(self, name, params)
+
+    # Server-side functions from sql/
+    def _rpc_task_kpis(self, conn, p_assignee_id=None):
+        sql = """
+            select
+                count(case when status = 'Pending' then 1 end) as active,
+                count(case when status = 'Finished' then 1 end) as completed,
+                count(case when priority = 'High' then 1 end) as high_priority,
+                count(*) as total
+            from "TasksTable"
+        """
+        params = []
+        if p_assignee_id is not None:
+            sql += " where assigned_to_id = ?"
+            params.append(p_assignee_id)
+        return [dict(conn.execute(sql, params).fetchone())]
+
+    def _rpc_delete_tasks(self, conn, p_task_ids):
+        ids = list(p_task_ids)
+        if not ids:
+            return []
+        marks = ", ".join("?" * len(ids))
+        conn.execute(f'delete from "FollowupsTable" where task_id in ({marks})', ids)
+        conn.execute(f'delete from "TaskFilesTable" where task_id in ({marks})', ids)
+        # Foreign keys are off in SQLite by default, so no cascade
+        conn.execute(f'delete from "TaskAlertsTable" where task_id in ({marks})', ids)
+        cursor = conn.execute(f'delete from "TasksTable" where id in ({marks}) returning *', ids)
+        return [dict(r) for r in cursor.fetchall()]
+
+
+def make_backend(kind="supabase", client=None, path=":memory:"):
+    if kind == "sqlite":
+        return SQLiteBackend(path)
+    return SupabaseBackend(client)
@@ -0,0 +1,62 @@
+import io
+import os
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# ==========================================
+# IMAGE RENDITIONS
+# ==========================================
+# Photos get a small thumbnail for the file grid and a mid-size preview,
+# made once at upload and stored in the blob store next to the original.
+# Without Pillow uploads still work, they just have no renditions.
+THUMB_SIZE = (320, 320)
+PREVIEW_SIZE = (1280, 1280)
+THUMB_QUALITY = 75
+PREVIEW_QUALITY = 82
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp", ".tif", ".tiff"}
+
+
+def is_image(file_name, file_type=None):
+    if file_type and file_type.startswith("image/"):
+        return True
+    return os.path.splitext(file_name or "")[1].lower() in IMAGE_EXTENSIONS
+
+
+def _jpeg(image, quality):
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=quality, optimize=True)
+    return out.getvalue()
+
+
+def make_renditions(fileobj, blob_store):
+    # ({"thumb_hash", "preview_hash"}, [blob size info]) for an image,
+    # ({}, []) if it cannot be read
+    if Image is None:
+        return {}, []
+    try:
+        fileobj.seek(0)
+        with Image.open(fileobj) as image:
+            # JPEGs decode straight at a reduced scale, much faster for
+            # large photos than decoding every pixel
+            image.draft("RGB", PREVIEW_SIZE)
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGBA")
+                background = Image.new("RGB", image.size, "white")
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+            image.thumbnail(PREVIEW_SIZE)
+            preview = _jpeg(image, PREVIEW_QUALITY)
+            image.thumbnail(THUMB_SIZE)
+            thumb = _jpeg(image, THUMB_QUALITY)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return {}, []
+    renditions, blobs = {}, []
+    for field, data in (("preview_hash", preview), ("thumb_hash", thumb)):
+        content_hash, size, stored_size = blob_store.put(data)
+        renditions[field] = content_hash
+        blobs.append({"hash": content_hash, "size": size, "stored_size": stored_size})
+    return renditions, blobs
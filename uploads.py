@@ -0,0 +1,101 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import repository
+import thumbnails
+
+# ==========================================
+# UPLOAD PIPELINE
+# ==========================================
+# Files in a batch are hashed and streamed into the blob store concurrently,
+# images also get their thumbnail and preview in the same worker, then all
+# their metadata rows are written with a single insert.
+MAX_FILE_MB = 25
+MAX_BATCH_MB = 200
+UPLOAD_WORKERS = 4
+CHUNK_SIZE = 1024 * 1024
+# Office files are zip archives
+PRECOMPRESSED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".zip", ".gz", ".7z", ".rar",
+                            ".mp3", ".mp4", ".mov", ".docx", ".xlsx", ".pptx"}
+
+_pool = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+
+
+def _file_size(file):
+    size = getattr(file, "size", None)
+    if size is None:
+        pos = file.tell()
+        file.seek(0, 2)
+        size = file.tell()
+        file.seek(pos)
+    return size
+
+
+def check_limits(files, max_file_bytes, max_batch_bytes):
+    # Split a batch into files to upload and (name, reason) rejections
+    accepted, rejected = [], []
+    batch_bytes = 0
+    for file in files:
+        size = _file_size(file)
+        if size > max_file_bytes:
+            rejected.append((file.name, f"larger than {max_file_bytes // (1024 * 1024)} MB"))
+        elif batch_bytes + size > max_batch_bytes:
+            rejected.append((file.name, f"batch limit of {max_batch_bytes // (1024 * 1024)} MB reached"))
+        else:
+            batch_bytes += size
+            accepted.append(file)
+    return accepted, rejected
+
+
+def should_compress(file_name, file_type=None):
+    # Formats that are already compressed gain nothing; everything else is
+    # tried and only kept compressed if it shrinks (see blobstore.py)
+    if file_type and file_type.startswith(("image/", "video/", "audio/")):
+        return False
+    return os.path.splitext(file_name or "")[1].lower() not in PRECOMPRESSED_EXTENSIONS
+
+
+def _store(blob_store, file):
+    # (file record, [blob size info]) for one upload
+    file.seek(0)
+    content_hash, size, stored_size = blob_store.put_stream(
+        file, chunk_size=CHUNK_SIZE, compress=should_compress(file.name, file.type))
+    record = {"file_name": file.name, "file_type": file.type, "file_size": size, "content_hash": content_hash}
+    blobs = [{"hash": content_hash, "size": size, "stored_size": stored_size}]
+    if thumbnails.is_image(file.name, file.type):
+        renditions, rendition_blobs = thumbnails.make_renditions(file, blob_store)
+        record.update(renditions)
+        blobs.extend(rendition_blobs)
+    return record, blobs
+
+
+def upload_files(files, task_id, uploaded_by, blob_store,
+                 max_file_bytes=MAX_FILE_MB * 1024 * 1024,
+                 max_batch_bytes=MAX_BATCH_MB * 1024 * 1024,
+                 on_progress=None):
+    # Returns (inserted records, [(file name, reason), ...])
+    accepted, errors = check_limits(files, max_file_bytes, max_batch_bytes)
+    uploaded_at = datetime.now().isoformat()
+    records, blobs = [], []
+    futures = {_pool.submit(_store, blob_store, file): file for file in accepted}
+    for done, future in enumerate(as_completed(futures), start=1):
+        file = futures[future]
+        try:
+            record, stored = future.result()
+            record.update({"task_id": task_id, "uploaded_by": uploaded_by, "uploaded_at": uploaded_at})
+            records.append(record)
+            blobs.extend(stored)
+        except Exception as e:
+            errors.append((file.name, str(e)))
+        if on_progress:
+            on_progress(done, len(futures), file.name)
+    if records:
+        try:
+            # Sizes first; the file rows then add the references
+            repository.record_blobs(blobs)
+            repository.insert_files(records)
+        except Exception as e:
+            errors.extend((r["file_name"], str(e)) for r in records)
+            records = []
+    return records, errors